@@ -0,0 +1,68 @@
+"""
+bq_client.py
+Shared, lazily-created BigQuery client for the loader, setup and SQL runners.
+
+Importing this module does not import google.cloud or read credentials. The client is
+built on first get_client() call by a replaceable factory (set_client_factory), so dry
+runs and imports stay fast and credential-free.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def must_getenv(name: str) -> str:
+    v = os.getenv(name)
+    if not v:
+        raise ValueError(f"Missing required env var: {name}")
+    return v
+
+
+def project_id() -> str:
+    return must_getenv("GOOGLE_CLOUD_PROJECT")
+
+
+def dataset_id() -> str:
+    return f"{project_id()}.{must_getenv('BIGQUERY_DATASET')}"
+
+
+def default_client_factory():
+    """Service-account key if GOOGLE_APPLICATION_CREDENTIALS is set, else Application Default Credentials."""
+    from google.cloud import bigquery
+
+    creds_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")  # optional: local only
+    if creds_path:
+        # Local dev: use a downloaded service account key JSON
+        from google.oauth2 import service_account
+
+        credentials = service_account.Credentials.from_service_account_file(creds_path)
+        return bigquery.Client(credentials=credentials, project=project_id())
+
+    # Cloud Run / GCE / GKE: use Application Default Credentials (service account identity)
+    return bigquery.Client(project=project_id())
+
+
+_client_factory = default_client_factory
+_client = None
+
+
+def set_client_factory(factory) -> None:
+    """Swap how the client is built (e.g. a fake for tests); drops any cached client."""
+    global _client_factory, _client
+    _client_factory = factory
+    _client = None
+
+
+def get_client():
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = _client_factory()
+    return _client
+
+
+def run_sql(sql: str) -> None:
+    job = get_client().query(sql)
+    job.result()
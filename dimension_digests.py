@@ -0,0 +1,126 @@
+"""
+dimension_digests.py
+Content hashes for the dimension loads (products / variants / locations).
+
+Each row gets a stable SHA-256 of its JSON content (sorted keys), and each table a
+digest over its (id, row hash) pairs in id order. The loader records {table, digest,
+row hashes, table last_modified_time} in the dimension_digests table of the same
+dataset right after each write, so any machine / Cloud Run job can skip tables whose
+digest did not change, or MERGE only the rows that did.
+
+No recorded state, or a table modified after its state was recorded (e.g. `setup`
+re-created it), simply means "no previous run" -> full load.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+STATE_TABLE = "dimension_digests"
+STATE_SCHEMA = [
+    ("table_name", "STRING"),
+    ("digest", "STRING"),
+    ("row_hashes", "STRING"),  # JSON {id: row hash}
+    ("table_last_modified", "INT64"),  # epoch ms, compared with __TABLES__.last_modified_time
+    ("recorded_at", "TIMESTAMP"),
+]
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    payload = json.dumps(row, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def row_hashes(rows: List[Dict[str, Any]], id_field: str) -> Optional[Dict[str, str]]:
+    """{id: row hash}, or None if any row lacks an ID or an ID repeats (can't diff safely)."""
+    hashes = {}
+    for row in rows:
+        row_id = row.get(id_field)
+        if not row_id or row_id in hashes:
+            return None
+        hashes[row_id] = row_hash(row)
+    return hashes
+
+
+def table_digest(hashes: Dict[str, str]) -> str:
+    digest = hashlib.sha256()
+    for row_id in sorted(hashes):
+        digest.update(f"{row_id}:{hashes[row_id]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def diff_hashes(previous: Dict[str, str], current: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """Return (changed_or_new_ids, removed_ids)."""
+    changed = [row_id for row_id, h in current.items() if previous.get(row_id) != h]
+    removed = [row_id for row_id in previous if row_id not in current]
+    return changed, removed
+
+
+def table_last_modified(dataset: str, table: str) -> int:
+    """The table's last_modified_time in epoch ms (same unit as __TABLES__)."""
+    from bq_client import get_client
+
+    modified = get_client().get_table(f"{dataset}.{table}").modified
+    return round(modified.timestamp() * 1000)
+
+
+def load_state(dataset: str) -> Dict[str, Any]:
+    """
+    Per-table {digest, rows, last_modified} recorded by the last load into this dataset.
+    Entries whose table was modified after it was recorded are dropped, so that table
+    gets a full load. {} if nothing has been recorded yet.
+    """
+    from google.api_core.exceptions import NotFound
+
+    from bq_client import get_client
+
+    try:
+        rows = list(get_client().query(f"""
+        SELECT d.table_name, d.digest, d.row_hashes, d.table_last_modified, t.last_modified_time
+        FROM `{dataset}.{STATE_TABLE}` d
+        LEFT JOIN `{dataset}.__TABLES__` t
+          ON t.table_id = d.table_name
+        """).result())
+    except NotFound:
+        return {}
+
+    tables = {}
+    for row in rows:
+        if row["last_modified_time"] is None or row["last_modified_time"] != row["table_last_modified"]:
+            continue  # re-created (setup) or written outside the loader since: hashes are stale
+        tables[row["table_name"]] = {
+            "digest": row["digest"],
+            "rows": json.loads(row["row_hashes"]),
+            "last_modified": row["table_last_modified"],
+        }
+    return tables
+
+
+def save_state(dataset: str, tables: Dict[str, Any]) -> None:
+    """Replace the recorded state with `tables` (one WRITE_TRUNCATE load job, atomic)."""
+    from google.cloud import bigquery
+
+    from bq_client import get_client, run_sql
+
+    table_id = f"{dataset}.{STATE_TABLE}"
+    if not tables:
+        run_sql(f"DROP TABLE IF EXISTS `{table_id}`")
+        return
+
+    recorded_at = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {
+            "table_name": table,
+            "digest": entry["digest"],
+            "row_hashes": json.dumps(entry["rows"], separators=(",", ":")),
+            "table_last_modified": entry["last_modified"],
+            "recorded_at": recorded_at,
+        }
+        for table, entry in sorted(tables.items())
+    ]
+    job_config = bigquery.LoadJobConfig(
+        write_disposition="WRITE_TRUNCATE",
+        schema=[bigquery.SchemaField(name, field_type) for name, field_type in STATE_SCHEMA],
+    )
+    get_client().load_table_from_json(rows, table_id, job_config=job_config).result()
@@ -3,8 +3,14 @@ load_to_bigquery.py
 Loads synced Shopify data (sync_data.json) into BigQuery.
 
 Pattern:
-- products/variants/locations = full refresh (WRITE_TRUNCATE)
+- products/variants/locations = content-hashed vs the previous run (recorded in the
+  dimension_digests table): skip if unchanged, MERGE only changed rows if the diff is
+  small, else full refresh (WRITE_TRUNCATE);
+  the shared variant_index is rebuilt only when one of them was written
 - inventory & sales = load into *_stg (WRITE_TRUNCATE), then MERGE into *_raw backup tables
+- INVENTORY_SNAPSHOT_MODE=delta: also append only changed inventory rows (+ periodic
+  keyframes) to inventory_snapshot_deltas for cheap long-term history; raw is still
+  written, so set INVENTORY_RAW_RETENTION_DAYS to shrink it and actually save storage
 
 Why *_raw?
 - Acts as daily backup/history (append/dedupe by ID)
@@ -16,36 +22,45 @@ Requires:
 
 import os
 import json
-from typing import Any, Dict, List
-from dotenv import load_dotenv
-from google.cloud import bigquery
-from google.oauth2 import service_account
-
-load_dotenv()
-
-
-def must_getenv(name: str) -> str:
-    v = os.getenv(name)
-    if not v:
-        raise ValueError(f"Missing required env var: {name}")
-    return v
-
-
-# ---- Env ----
-PROJECT_ID = must_getenv("GOOGLE_CLOUD_PROJECT")
-DATASET_NAME = must_getenv("BIGQUERY_DATASET")
-CREDS_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")  # optional: local only
-
-DATASET_ID = f"{PROJECT_ID}.{DATASET_NAME}"
-
-# ---- Client ----
-if CREDS_PATH:
-    # Local dev: use a downloaded service account key JSON
-    credentials = service_account.Credentials.from_service_account_file(CREDS_PATH)
-    client = bigquery.Client(credentials=credentials, project=PROJECT_ID)
-else:
-    # Cloud Run / GCE / GKE: use Application Default Credentials (service account identity)
-    client = bigquery.Client(project=PROJECT_ID)
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bq_client import dataset_id, get_client, run_sql
+from dimension_digests import (
+    diff_hashes,
+    load_state,
+    row_hashes,
+    save_state,
+    table_digest,
+    table_last_modified,
+)
+from variant_index import VariantIndex
+
+# Dimension tables: refreshed only when their content digest changes
+DIMENSION_TABLES = ["products", "variants", "locations"]
+# MERGE changed rows instead of WRITE_TRUNCATE when at most this share of rows changed
+DEFAULT_MERGE_MAX_FRACTION = 0.2
+
+# Required, non-empty ID field per sync_data.json section (checked by --dry-run)
+REQUIRED_IDS = {
+    "products": "product_id",
+    "variants": "variant_id",
+    "locations": "location_id",
+    "inventory": "snapshot_id",
+    "sales": "sale_id",
+}
+
+# INVENTORY_SNAPSHOT_MODE=delta also writes changed (variant, location) rows + periodic
+# keyframes into inventory_snapshot_deltas (see sql/00_setup/06_inventory_snapshot_deltas.sql)
+SNAPSHOT_MODES = ("full", "delta")
+# inventory_as_of() looks back 35 days for a keyframe, so keyframes must be closer than that
+MAX_KEYFRAME_DAYS = 28
+# Restock / data-readiness SQL reads up to 30 days of inventory_snapshots_raw
+MIN_RAW_RETENTION_DAYS = 35
+# Single definition of inventory_snapshot_deltas + inventory_as_of(D), written against the
+# default dataset name (replaced with dataset_id() when the loader runs it)
+DELTAS_DDL_PATH = Path(__file__).resolve().parent / "sql/00_setup/06_inventory_snapshot_deltas.sql"
+SQL_DEFAULT_DATASET = "fiesta-inventory-forecast.fiesta_inventory"
 
 
 def load_data_to_table(
@@ -58,7 +73,10 @@ def load_data_to_table(
         print(f"  ⚠️  No data to load for {table_name}")
         return
 
-    table_id = f"{DATASET_ID}.{table_name}"
+    from google.cloud import bigquery
+
+    client = get_client()
+    table_id = f"{dataset_id()}.{table_name}"
 
     job_config = bigquery.LoadJobConfig(
         write_disposition=write_disposition,
@@ -72,14 +90,190 @@ def load_data_to_table(
     print(f"  ✓ Loaded {table.num_rows} rows into {table_name}")
 
 
-def run_sql(sql: str) -> None:
-    job = client.query(sql)
-    job.result()
-
-
 def truncate_table(table_name: str) -> None:
     """TRUNCATE a table so staging doesn't keep old rows on days with no data."""
-    run_sql(f"TRUNCATE TABLE `{DATASET_ID}.{table_name}`")
+    run_sql(f"TRUNCATE TABLE `{dataset_id()}.{table_name}`")
+
+
+def merge_max_fraction() -> float:
+    return float(os.getenv("DIMENSION_MERGE_MAX_FRACTION", str(DEFAULT_MERGE_MAX_FRACTION)))
+
+
+def force_dimension_reload() -> bool:
+    return os.getenv("DIMENSION_FORCE_RELOAD", "").lower() in ("1", "true", "yes")
+
+
+def plan_dimension(
+    table: str,
+    rows: List[Dict[str, Any]],
+    previous: Optional[Dict[str, Any]],
+    max_fraction: float,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Decide how to refresh one dimension table from its content hashes:
+      skip     - digest matches the previous run
+      merge    - changed + removed rows <= max_fraction of the table
+      truncate - no previous run, forced, large diff, or rows without unique IDs
+    """
+    hashes = row_hashes(rows, REQUIRED_IDS[table])
+    plan = {"action": "truncate", "hashes": hashes, "digest": None, "changed": [], "removed": []}
+    if hashes is None:
+        return plan
+    plan["digest"] = table_digest(hashes)
+    if force or not previous:
+        return plan
+    if previous.get("digest") == plan["digest"]:
+        plan["action"] = "skip"
+        return plan
+
+    changed, removed = diff_hashes(previous.get("rows", {}), hashes)
+    plan["changed"], plan["removed"] = changed, removed
+    if len(changed) + len(removed) <= max_fraction * len(hashes):
+        plan["action"] = "merge"
+    return plan
+
+
+def describe_dimension_plan(table: str, plan: Dict[str, Any], n_rows: int) -> str:
+    if plan["action"] == "skip":
+        return f"SKIP {table} (unchanged, digest {plan['digest'][:12]})"
+    if plan["action"] == "merge":
+        return f"MERGE {table} ({len(plan['changed'])} changed, {len(plan['removed'])} removed of {n_rows})"
+    return f"LOAD {table} WRITE_TRUNCATE ({n_rows} rows)"
+
+
+def merge_dimension_rows(table: str, rows: List[Dict[str, Any]], removed_ids: List[str]) -> None:
+    """Upsert changed rows via a *_changes_stg table and delete removed IDs."""
+    from google.cloud import bigquery
+
+    client = get_client()
+    dataset = dataset_id()
+    key = REQUIRED_IDS[table]
+
+    if rows:
+        # Stage with the target's schema so MERGE column types line up
+        target = client.get_table(f"{dataset}.{table}")
+        columns = [field.name for field in target.schema]
+        stg = f"{dataset}.{table}_changes_stg"
+        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE", schema=target.schema)
+        client.load_table_from_json(rows, stg, job_config=job_config).result()
+
+        set_clause = ",\n          ".join(f"{c} = S.{c}" for c in columns if c != key)
+        column_list = ", ".join(columns)
+        value_list = ", ".join(f"S.{c}" for c in columns)
+        run_sql(f"""
+        MERGE `{dataset}.{table}` T
+        USING `{stg}` S
+        ON T.{key} = S.{key}
+        WHEN MATCHED THEN UPDATE SET
+          {set_clause}
+        WHEN NOT MATCHED THEN
+          INSERT ({column_list})
+          VALUES ({value_list});
+        """)
+
+    if removed_ids:
+        id_list = ", ".join(json.dumps(str(row_id)) for row_id in removed_ids)
+        run_sql(f"DELETE FROM `{dataset}.{table}` WHERE {key} IN ({id_list})")
+
+    print(f"  ✓ Merged {len(rows)} changed / {len(removed_ids)} removed rows into {table}")
+
+
+def refresh_variant_index() -> None:
+    """Rebuild the shared variant_index if its procedure exists (sql/00_setup/07)."""
+    dataset = dataset_id()
+    run_sql(f"""
+    IF EXISTS (
+      SELECT 1 FROM `{dataset}.INFORMATION_SCHEMA.ROUTINES`
+      WHERE routine_name = 'ensure_variant_index'
+    ) THEN
+      EXECUTE IMMEDIATE 'CALL `{dataset}.ensure_variant_index`()';
+    END IF;
+    """)
+
+
+def validate_sync_data(data: Dict[str, Any]) -> List[str]:
+    """Return a list of problems (missing sections / rows without IDs); empty means loadable."""
+    problems = []
+    for section, id_field in REQUIRED_IDS.items():
+        rows = data.get(section)
+        if rows is None:
+            problems.append(f"missing section '{section}'")
+            continue
+        missing = sum(1 for r in rows if not r.get(id_field))
+        if missing:
+            problems.append(f"{section}: {missing} rows without {id_field}")
+    return problems
+
+
+def plan_jobs(data: Dict[str, Any]) -> List[str]:
+    """Describe the BigQuery jobs main() would run for this sync payload (no GCP calls)."""
+    plan = ["CREATE TABLE IF NOT EXISTS *_raw / *_stg backup tables"]
+    force = force_dimension_reload()
+    for table in DIMENSION_TABLES:
+        rows = data.get(table, [])
+        if not rows:
+            plan.append(f"SKIP {table} (no rows)")
+            continue
+        # Previous digests live in BigQuery, so the dry run only shows what is compared
+        dim_plan = plan_dimension(table, rows, None, merge_max_fraction(), force)
+        if dim_plan["digest"] is None or force:
+            plan.append(describe_dimension_plan(table, dim_plan, len(rows)))
+        else:
+            plan.append(
+                f"SKIP / MERGE / LOAD {table} by digest {dim_plan['digest'][:12]} "
+                f"vs dimension_digests ({len(rows)} rows)"
+            )
+    if any(data.get(table) for table in DIMENSION_TABLES):
+        index = VariantIndex.from_sync_data(data)
+        unmapped = len(data.get("variants", [])) - len(index)
+        plan.append(f"CALL ensure_variant_index() if dimensions changed ({len(index)} variants, {unmapped} without vendor)")
+    for section, stg, raw in (
+        ("inventory", "inventory_snapshots_stg", "inventory_snapshots_raw"),
+        ("sales", "sales_history_stg", "sales_history_raw"),
+    ):
+        rows = data.get(section, [])
+        if rows:
+            plan.append(f"LOAD {stg} WRITE_TRUNCATE ({len(rows)} rows)")
+            plan.append(f"MERGE {stg} -> {raw}")
+        else:
+            plan.append(f"TRUNCATE {stg}")
+    if snapshot_mode() == "delta" and data.get("inventory"):
+        plan.append(
+            "INSERT inventory_snapshots_stg -> inventory_snapshot_deltas "
+            f"(changes only, keyframe every {keyframe_days()} days)"
+        )
+        retention = raw_retention_days()
+        if retention:
+            plan.append(f"ALTER inventory_snapshots_raw partition_expiration_days = {retention}")
+    return plan
+
+
+def snapshot_mode() -> str:
+    mode = os.getenv("INVENTORY_SNAPSHOT_MODE", "full").strip().lower()
+    if mode not in SNAPSHOT_MODES:
+        raise ValueError(f"INVENTORY_SNAPSHOT_MODE must be one of {SNAPSHOT_MODES}, got {mode!r}")
+    return mode
+
+
+def keyframe_days() -> int:
+    days = int(os.getenv("INVENTORY_KEYFRAME_DAYS", "7"))
+    if not 1 <= days <= MAX_KEYFRAME_DAYS:
+        raise ValueError(f"INVENTORY_KEYFRAME_DAYS must be between 1 and {MAX_KEYFRAME_DAYS}, got {days}")
+    return days
+
+
+def raw_retention_days() -> Optional[int]:
+    """Raw inventory partition expiry to apply in delta mode (None = leave raw's setting as-is)."""
+    value = os.getenv("INVENTORY_RAW_RETENTION_DAYS", "").strip()
+    if not value:
+        return None
+    days = int(value)
+    if days < MIN_RAW_RETENTION_DAYS:
+        raise ValueError(
+            f"INVENTORY_RAW_RETENTION_DAYS must be at least {MIN_RAW_RETENTION_DAYS}, got {days}"
+        )
+    return days
 
 
 def ensure_backup_tables_exist() -> None:
@@ -87,9 +281,11 @@ def ensure_backup_tables_exist() -> None:
     Ensure *_raw backup tables + staging tables exist.
     Does NOT depend on analytics tables (sales_history / inventory_snapshots).
     """
+    dataset = dataset_id()
+
     # 1) sales_history_raw (partitioned)
     run_sql(f"""
-    CREATE TABLE IF NOT EXISTS `{DATASET_ID}.sales_history_raw` (
+    CREATE TABLE IF NOT EXISTS `{dataset}.sales_history_raw` (
       sale_id STRING NOT NULL,
       order_id STRING,
       order_name STRING,
@@ -108,7 +304,7 @@ def ensure_backup_tables_exist() -> None:
 
     # 2) inventory_snapshots_raw (partitioned)
     run_sql(f"""
-    CREATE TABLE IF NOT EXISTS `{DATASET_ID}.inventory_snapshots_raw` (
+    CREATE TABLE IF NOT EXISTS `{dataset}.inventory_snapshots_raw` (
       snapshot_id STRING NOT NULL,
       variant_id STRING,
       sku STRING,
@@ -125,7 +321,7 @@ def ensure_backup_tables_exist() -> None:
 
     # 3) staging tables (non-partitioned is fine; truncated each run)
     run_sql(f"""
-    CREATE TABLE IF NOT EXISTS `{DATASET_ID}.sales_history_stg` (
+    CREATE TABLE IF NOT EXISTS `{dataset}.sales_history_stg` (
       sale_id STRING,
       order_id STRING,
       order_name STRING,
@@ -141,7 +337,7 @@ def ensure_backup_tables_exist() -> None:
     """)
 
     run_sql(f"""
-    CREATE TABLE IF NOT EXISTS `{DATASET_ID}.inventory_snapshots_stg` (
+    CREATE TABLE IF NOT EXISTS `{dataset}.inventory_snapshots_stg` (
       snapshot_id STRING,
       variant_id STRING,
       sku STRING,
@@ -155,7 +351,96 @@ def ensure_backup_tables_exist() -> None:
     """)
 
 
-def main():
+def ensure_delta_tables_exist() -> None:
+    """Create inventory_snapshot_deltas + inventory_as_of(D) from sql/00_setup/06 (no-op if present)."""
+    sql = DELTAS_DDL_PATH.read_text(encoding="utf-8")
+    run_sql(sql.replace(f"`{SQL_DEFAULT_DATASET}.", f"`{dataset_id()}."))
+
+
+def apply_raw_retention(days: int) -> None:
+    """Shorten inventory_snapshots_raw history once deltas carry the long-term record."""
+    run_sql(f"""
+    ALTER TABLE `{dataset_id()}.inventory_snapshots_raw`
+    SET OPTIONS (partition_expiration_days = {days});
+    """)
+
+
+def merge_inventory_deltas(keyframe_every: int) -> None:
+    """
+    Write each staged snapshot day into inventory_snapshot_deltas as changes vs the
+    reconstructed previous day (or a full keyframe if none in the last keyframe_every days).
+    Re-running a day replaces that day's deltas.
+    """
+    dataset = dataset_id()
+
+    run_sql(f"""
+    DECLARE d DATE;
+    DECLARE keyframe BOOL;
+
+    FOR day IN (
+      SELECT DISTINCT snapshot_date
+      FROM `{dataset}.inventory_snapshots_stg`
+      ORDER BY snapshot_date
+    )
+    DO
+      SET d = day.snapshot_date;
+      SET keyframe = NOT EXISTS (
+        SELECT 1 FROM `{dataset}.inventory_snapshot_deltas`
+        WHERE is_keyframe
+          AND snapshot_date BETWEEN DATE_SUB(d, INTERVAL {keyframe_every - 1} DAY)
+                                AND DATE_SUB(d, INTERVAL 1 DAY)
+      );
+
+      DELETE FROM `{dataset}.inventory_snapshot_deltas`
+      WHERE snapshot_date = d;
+
+      INSERT INTO `{dataset}.inventory_snapshot_deltas` (
+        snapshot_date, variant_id, location_id, sku,
+        available_qty, incoming_qty, committed_qty, snapshot_timestamp,
+        is_keyframe, is_deleted
+      )
+      WITH cur AS (
+        SELECT variant_id, location_id, sku, available_qty, incoming_qty, committed_qty, snapshot_timestamp
+        FROM `{dataset}.inventory_snapshots_stg`
+        WHERE snapshot_date = d
+        QUALIFY ROW_NUMBER() OVER (
+          PARTITION BY variant_id, location_id
+          ORDER BY snapshot_timestamp DESC
+        ) = 1
+      ),
+      prev AS (
+        SELECT * FROM `{dataset}.inventory_as_of`(DATE_SUB(d, INTERVAL 1 DAY))
+      )
+      SELECT
+        d, c.variant_id, c.location_id, c.sku,
+        c.available_qty, c.incoming_qty, c.committed_qty, c.snapshot_timestamp,
+        keyframe, FALSE
+      FROM cur c
+      LEFT JOIN prev p
+        ON p.variant_id = c.variant_id
+       AND p.location_id = c.location_id
+      WHERE keyframe
+         OR p.variant_id IS NULL
+         OR c.available_qty IS DISTINCT FROM p.available_qty
+         OR c.incoming_qty IS DISTINCT FROM p.incoming_qty
+         OR c.committed_qty IS DISTINCT FROM p.committed_qty
+      UNION ALL
+      -- tombstones: pairs that vanished since the previous state (keyframes reset state anyway)
+      SELECT
+        d, p.variant_id, p.location_id, p.sku,
+        NULL, NULL, NULL, NULL,
+        FALSE, TRUE
+      FROM prev p
+      LEFT JOIN cur c
+        ON c.variant_id = p.variant_id
+       AND c.location_id = p.location_id
+      WHERE NOT keyframe
+        AND c.variant_id IS NULL;
+    END FOR;
+    """)
+
+
+def main(dry_run: bool = False):
     print("=" * 60)
     print("LOADING DATA TO BIGQUERY (dimensions + staging + merge into *_raw backups)")
     print("=" * 60)
@@ -164,14 +449,66 @@ def main():
     with open(sync_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
+    if dry_run:
+        # Validate inputs and print the job plan without touching GCP.
+        print(f"\n🧪 Dry run: {sync_path} -> {dataset_id()}")
+        problems = validate_sync_data(data)
+        for step in plan_jobs(data):
+            print(f"  • {step}")
+        for problem in problems:
+            print(f"  ⚠️  {problem}")
+        if problems:
+            raise ValueError(f"{len(problems)} problem(s) in {sync_path}")
+        print("\n✅ Dry run OK (no jobs submitted)")
+        return
+
+    dataset = dataset_id()
+    # Validate snapshot mode settings before any job runs
+    delta_mode = snapshot_mode() == "delta"
+    keyframe_every = keyframe_days() if delta_mode else None
+    raw_retention = raw_retention_days() if delta_mode else None
+
     # 0) Ensure raw backup tables exist (one-time / safe to run every time)
     ensure_backup_tables_exist()
 
-    # 1) Full refresh dimension-like tables
-    print("\n📤 Uploading dimensions (truncate/replace)...")
-    load_data_to_table("products", data.get("products", []), write_disposition="WRITE_TRUNCATE")
-    load_data_to_table("variants", data.get("variants", []), write_disposition="WRITE_TRUNCATE")
-    load_data_to_table("locations", data.get("locations", []), write_disposition="WRITE_TRUNCATE")
+    # 1) Dimension-like tables: skip / MERGE changed rows / full refresh by content digest
+    print("\n📤 Uploading dimensions (only if content changed)...")
+    dim_state = load_state(dataset)
+    max_fraction, force = merge_max_fraction(), force_dimension_reload()
+    dimensions_changed = False
+    for table in DIMENSION_TABLES:
+        rows = data.get(table, [])
+        if not rows:
+            load_data_to_table(table, rows)  # prints the "no data" warning, table left as-is
+            continue
+
+        dim_plan = plan_dimension(table, rows, dim_state.get(table), max_fraction, force)
+        if dim_plan["action"] == "skip":
+            print(f"  ⏭️  {table} unchanged (digest {dim_plan['digest'][:12]}), skipping load")
+            continue
+        if dim_plan["action"] == "merge":
+            changed = set(dim_plan["changed"])
+            key = REQUIRED_IDS[table]
+            merge_dimension_rows(table, [r for r in rows if r[key] in changed], dim_plan["removed"])
+        else:
+            load_data_to_table(table, rows, write_disposition="WRITE_TRUNCATE")
+        dimensions_changed = True
+
+        # Record the new digest only after the table was written successfully
+        if dim_plan["hashes"] is None:
+            dim_state.pop(table, None)
+        else:
+            dim_state[table] = {
+                "digest": dim_plan["digest"],
+                "rows": dim_plan["hashes"],
+                "last_modified": table_last_modified(dataset, table),
+            }
+        save_state(dataset, dim_state)
+
+    # Shared variant/vendor lookup: rebuilt only when a dimension was actually written
+    if dimensions_changed:
+        print("\n🗂️  Refreshing variant_index...")
+        refresh_variant_index()
 
     # 2) Facts via staging then MERGE (dedupe by IDs) into *_raw backups
     print("\n📤 Uploading facts to staging (truncate staging)...")
@@ -195,11 +532,11 @@ def main():
     # Inventory merge → inventory_snapshots_raw
     if inventory_rows:
         run_sql(f"""
-        DECLARE min_d DATE DEFAULT (SELECT MIN(snapshot_date) FROM `{DATASET_ID}.inventory_snapshots_stg`);
-        DECLARE max_d DATE DEFAULT (SELECT MAX(snapshot_date) FROM `{DATASET_ID}.inventory_snapshots_stg`);
+        DECLARE min_d DATE DEFAULT (SELECT MIN(snapshot_date) FROM `{dataset}.inventory_snapshots_stg`);
+        DECLARE max_d DATE DEFAULT (SELECT MAX(snapshot_date) FROM `{dataset}.inventory_snapshots_stg`);
 
-        MERGE `{DATASET_ID}.inventory_snapshots_raw` T
-        USING `{DATASET_ID}.inventory_snapshots_stg` S
+        MERGE `{dataset}.inventory_snapshots_raw` T
+        USING `{dataset}.inventory_snapshots_stg` S
         ON T.snapshot_id = S.snapshot_id
            AND T.snapshot_date BETWEEN min_d AND max_d
         WHEN MATCHED THEN UPDATE SET
@@ -223,14 +560,23 @@ def main():
           );
         """)
 
+    # Delta-encoded inventory history (optional) → inventory_snapshot_deltas
+    if inventory_rows and delta_mode:
+        print(f"\n🧩 Writing inventory deltas (keyframe every {keyframe_every} days)...")
+        ensure_delta_tables_exist()
+        merge_inventory_deltas(keyframe_every)
+        if raw_retention:
+            print(f"  ✂️  inventory_snapshots_raw partition expiry -> {raw_retention} days")
+            apply_raw_retention(raw_retention)
+
     # Sales merge → sales_history_raw
     if sales_rows:
         run_sql(f"""
-        DECLARE min_d DATE DEFAULT (SELECT MIN(sale_date) FROM `{DATASET_ID}.sales_history_stg`);
-        DECLARE max_d DATE DEFAULT (SELECT MAX(sale_date) FROM `{DATASET_ID}.sales_history_stg`);
+        DECLARE min_d DATE DEFAULT (SELECT MIN(sale_date) FROM `{dataset}.sales_history_stg`);
+        DECLARE max_d DATE DEFAULT (SELECT MAX(sale_date) FROM `{dataset}.sales_history_stg`);
 
-        MERGE `{DATASET_ID}.sales_history_raw` T
-        USING `{DATASET_ID}.sales_history_stg` S
+        MERGE `{dataset}.sales_history_raw` T
+        USING `{dataset}.sales_history_stg` S
         ON T.sale_id = S.sale_id
            AND T.sale_date BETWEEN min_d AND max_d
         WHEN MATCHED THEN UPDATE SET
@@ -0,0 +1,144 @@
+"""
+pipeline.py
+Single CLI entry point for the inventory pipeline.
+
+  python pipeline.py sync              # Shopify -> sync_data.json
+  python pipeline.py load              # sync_data.json -> BigQuery (*_stg + MERGE into *_raw)
+  python pipeline.py backup            # sync then load in one process (Cloud Run entry point)
+  python pipeline.py setup             # create dataset + base tables
+  python pipeline.py run-sql FILE...   # run BigQuery SQL script(s)
+  python pipeline.py restock           # weekly sales prep + validation + restock SQL
+  python pipeline.py restock --hierarchical   # ... using vendor/product-level forecasts
+
+Add --dry-run to validate inputs and print the planned jobs without any GCP import or
+Shopify request. Heavy dependencies are imported only inside the chosen subcommand.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# Weekly restock run: refresh sales_daily + variant_index, backtest per variant
+# (model_quality_flags), then restock with per-variant forecasts.
+RESTOCK_SQL = [
+    "sql/30_forecasting/00_prepare_sales.sql",
+    "sql/30_forecasting/00_model_validation.sql",
+    "sql/50_restock/00_create_weekly_restock_procedure.sql",
+    "sql/50_restock/01_weekly_restock.sql",
+]
+# Hierarchical run: no per-variant backtest; vendor/product models carry their own gate.
+HIERARCHICAL_RESTOCK_SQL = [
+    "sql/30_forecasting/00_prepare_sales.sql",
+    "sql/30_forecasting/03_hierarchical_demand_forecasts.sql",
+    "sql/50_restock/00_create_weekly_restock_procedure.sql",
+    "sql/50_restock/02_weekly_restock_hierarchical.sql",
+]
+
+
+def read_sql(path: str) -> str:
+    sql_path = Path(path)
+    if not sql_path.is_absolute() and not sql_path.exists():
+        sql_path = HERE / sql_path
+    sql = sql_path.read_text(encoding="utf-8")
+    if not sql.strip():
+        raise ValueError(f"Empty SQL file: {sql_path}")
+    return sql
+
+
+def run_sql_files(paths, dry_run=False):
+    # Read everything first so a typo in the last path fails before any job runs.
+    scripts = [(path, read_sql(path)) for path in paths]
+    if dry_run:
+        for path, sql in scripts:
+            print(f"  • would run {path} ({len(sql.splitlines())} lines)")
+        print("\n✅ Dry run OK (no jobs submitted)")
+        return
+
+    from bq_client import run_sql
+
+    for path, sql in scripts:
+        print(f"▶ Running {path}...", flush=True)
+        run_sql(sql)
+        print(f"  ✓ {path}")
+
+
+def cmd_sync(args):
+    import shopify_sync
+
+    shopify_sync.main(dry_run=args.dry_run)
+
+
+def cmd_load(args):
+    import load_to_bigquery
+
+    load_to_bigquery.main(dry_run=args.dry_run)
+
+
+def cmd_backup(args):
+    # One interpreter for both steps: imports + client setup are paid once per job
+    cmd_sync(args)
+    sync_path = os.getenv("SYNC_DATA_PATH", "sync_data.json")
+    if args.dry_run and not Path(sync_path).exists():
+        print(f"  • load: would load {sync_path} written by sync (not present yet, skipping validation)")
+        return
+    cmd_load(args)
+    if not args.dry_run:
+        print("✅ Backup pipeline completed", flush=True)
+
+
+def cmd_setup(args):
+    import setup_bigquery
+
+    setup_bigquery.main(dry_run=args.dry_run)
+
+
+def cmd_run_sql(args):
+    run_sql_files(args.files, dry_run=args.dry_run)
+
+
+def cmd_restock(args):
+    paths = HIERARCHICAL_RESTOCK_SQL if args.hierarchical else RESTOCK_SQL
+    run_sql_files(paths, dry_run=args.dry_run)
+
+
+def build_parser():
+    # --dry-run is accepted after any subcommand: `python pipeline.py load --dry-run`
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="validate inputs and print planned jobs; no GCP import, no Shopify requests",
+    )
+
+    parser = argparse.ArgumentParser(description="Fiesta inventory pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name, func, help_text):
+        p = sub.add_parser(name, parents=[common], help=help_text)
+        p.set_defaults(func=func)
+        return p
+
+    add("sync", cmd_sync, "sync Shopify data to SYNC_DATA_PATH")
+    add("load", cmd_load, "load SYNC_DATA_PATH into BigQuery")
+    add("backup", cmd_backup, "sync then load (daily backup job)")
+    add("setup", cmd_setup, "create BigQuery dataset and tables")
+    add("run-sql", cmd_run_sql, "run BigQuery SQL script file(s)").add_argument("files", nargs="+")
+    restock = add("restock", cmd_restock, "run weekly model validation + restock SQL")
+    restock.add_argument(
+        "--hierarchical",
+        action="store_true",
+        help="forecast at vendor/product level and allocate down to variants",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
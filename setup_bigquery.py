@@ -3,109 +3,103 @@ setup_bigquery.py
 Creates BigQuery dataset and tables for inventory forecasting
 """
 
-from google.cloud import bigquery
-from google.oauth2 import service_account
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Initialize BigQuery client
-credentials = service_account.Credentials.from_service_account_file(
-    os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-)
-client = bigquery.Client(
-    credentials=credentials,
-    project=os.getenv('GOOGLE_CLOUD_PROJECT')
-)
-
-dataset_id = f"{os.getenv('GOOGLE_CLOUD_PROJECT')}.{os.getenv('BIGQUERY_DATASET')}"
-
-def create_dataset():
-    """Create BigQuery dataset"""
-    dataset = bigquery.Dataset(dataset_id)
-    dataset.location = "US"
-    dataset = client.create_dataset(dataset, exists_ok=True)
-    print(f"✓ Dataset {dataset_id} created")
-
-def create_tables():
-    """Create all required tables"""
+from bq_client import dataset_id, get_client
 
+# (table_name, [(field, type, mode)], partition_field)
+TABLE_SPECS = [
     # Products table
-    products_schema = [
-        bigquery.SchemaField("product_id", "STRING", mode="REQUIRED"),
-        bigquery.SchemaField("title", "STRING"),
-        bigquery.SchemaField("vendor", "STRING"),
-        bigquery.SchemaField("status", "STRING"),
-        bigquery.SchemaField("created_at", "TIMESTAMP"),
-        bigquery.SchemaField("updated_at", "TIMESTAMP"),
-    ]
-    create_table("products", products_schema)
+    ("products", [
+        ("product_id", "STRING", "REQUIRED"),
+        ("title", "STRING", None),
+        ("vendor", "STRING", None),
+        ("status", "STRING", None),
+        ("created_at", "TIMESTAMP", None),
+        ("updated_at", "TIMESTAMP", None),
+    ], None),
 
     # Variants table
-    variants_schema = [
-        bigquery.SchemaField("variant_id", "STRING", mode="REQUIRED"),
-        bigquery.SchemaField("product_id", "STRING"),
-        bigquery.SchemaField("sku", "STRING"),
-        bigquery.SchemaField("title", "STRING"),
-        bigquery.SchemaField("price", "FLOAT64"),
-        bigquery.SchemaField("inventory_item_id", "STRING"),
-    ]
-    create_table("variants", variants_schema)
+    ("variants", [
+        ("variant_id", "STRING", "REQUIRED"),
+        ("product_id", "STRING", None),
+        ("sku", "STRING", None),
+        ("title", "STRING", None),
+        ("price", "FLOAT64", None),
+        ("inventory_item_id", "STRING", None),
+    ], None),
 
     # Locations table
-    locations_schema = [
-        bigquery.SchemaField("location_id", "STRING", mode="REQUIRED"),
-        bigquery.SchemaField("name", "STRING"),
-        bigquery.SchemaField("active", "BOOLEAN"),
-        bigquery.SchemaField("location_gid", "STRING"),
-    ]
-    create_table("locations", locations_schema)
+    ("locations", [
+        ("location_id", "STRING", "REQUIRED"),
+        ("name", "STRING", None),
+        ("active", "BOOLEAN", None),
+        ("location_gid", "STRING", None),
+    ], None),
 
     # Inventory snapshots table (partitioned by date)
-    inventory_schema = [
-        bigquery.SchemaField("snapshot_id", "STRING", mode="REQUIRED"),
-        bigquery.SchemaField("variant_id", "STRING"),
-        bigquery.SchemaField("sku", "STRING"),
-        bigquery.SchemaField("location_id", "STRING"),
-        bigquery.SchemaField("available_qty", "INT64"),
-        bigquery.SchemaField("incoming_qty", "INT64"),
-        bigquery.SchemaField("committed_qty", "INT64"),
-        bigquery.SchemaField("snapshot_date", "DATE", mode="REQUIRED"),
-        bigquery.SchemaField("snapshot_timestamp", "TIMESTAMP"),
-    ]
-    create_table("inventory_snapshots", inventory_schema, partition_field="snapshot_date")
+    ("inventory_snapshots", [
+        ("snapshot_id", "STRING", "REQUIRED"),
+        ("variant_id", "STRING", None),
+        ("sku", "STRING", None),
+        ("location_id", "STRING", None),
+        ("available_qty", "INT64", None),
+        ("incoming_qty", "INT64", None),
+        ("committed_qty", "INT64", None),
+        ("snapshot_date", "DATE", "REQUIRED"),
+        ("snapshot_timestamp", "TIMESTAMP", None),
+    ], "snapshot_date"),
 
     # Sales history table (partitioned by date)
-    sales_schema = [
-        bigquery.SchemaField("sale_id", "STRING", mode="REQUIRED"),
-        bigquery.SchemaField("order_id", "STRING"),
-        bigquery.SchemaField("order_name", "STRING"),
-        bigquery.SchemaField("variant_id", "STRING"),
-        bigquery.SchemaField("sku", "STRING"),
-        bigquery.SchemaField("product_title", "STRING"),
-        bigquery.SchemaField("quantity_sold", "INT64"),
-        bigquery.SchemaField("sale_date", "DATE", mode="REQUIRED"),
-        bigquery.SchemaField("sale_timestamp", "TIMESTAMP"),
-        bigquery.SchemaField("vendor", "STRING"),
-    ]
-    create_table("sales_history", sales_schema, partition_field="sale_date")
+    ("sales_history", [
+        ("sale_id", "STRING", "REQUIRED"),
+        ("order_id", "STRING", None),
+        ("order_name", "STRING", None),
+        ("variant_id", "STRING", None),
+        ("sku", "STRING", None),
+        ("product_title", "STRING", None),
+        ("quantity_sold", "INT64", None),
+        ("sale_date", "DATE", "REQUIRED"),
+        ("sale_timestamp", "TIMESTAMP", None),
+        ("vendor", "STRING", None),
+    ], "sale_date"),
 
     # Vendors table
-    vendors_schema = [
-        bigquery.SchemaField("vendor_id", "INT64", mode="REQUIRED"),
-        bigquery.SchemaField("vendor_name", "STRING"),
-        bigquery.SchemaField("lead_time_days", "INT64"),
-        bigquery.SchemaField("moq", "INT64"),
-        bigquery.SchemaField("pack_size", "INT64"),
-    ]
-    create_table("vendors", vendors_schema)
+    ("vendors", [
+        ("vendor_id", "INT64", "REQUIRED"),
+        ("vendor_name", "STRING", None),
+        ("lead_time_days", "INT64", None),
+        ("moq", "INT64", None),
+        ("pack_size", "INT64", None),
+    ], None),
+]
+
+
+def create_dataset():
+    """Create BigQuery dataset"""
+    from google.cloud import bigquery
+
+    dataset = bigquery.Dataset(dataset_id())
+    dataset.location = "US"
+    dataset = get_client().create_dataset(dataset, exists_ok=True)
+    print(f"✓ Dataset {dataset_id()} created")
+
+def create_tables():
+    """Create all required tables"""
+    from google.cloud import bigquery
+
+    for table_name, fields, partition_field in TABLE_SPECS:
+        schema = [
+            bigquery.SchemaField(name, field_type, mode=mode or "NULLABLE")
+            for name, field_type, mode in fields
+        ]
+        create_table(table_name, schema, partition_field=partition_field)
 
     print("\n✓ All tables created successfully!")
 
 def create_table(table_name, schema, partition_field=None):
     """Helper function to create a table"""
-    table_id = f"{dataset_id}.{table_name}"
+    from google.cloud import bigquery
+
+    table_id = f"{dataset_id()}.{table_name}"
     table = bigquery.Table(table_id, schema=schema)
 
     # Add partitioning if specified
@@ -115,11 +109,27 @@ def create_table(table_name, schema, partition_field=None):
             field=partition_field
         )
 
-    table = client.create_table(table, exists_ok=True)
+    table = get_client().create_table(table, exists_ok=True)
     print(f"  ✓ Table {table_name} created")
 
-if __name__ == "__main__":
+def plan_setup():
+    """Describe what setup would create (no GCP calls)."""
+    plan = [f"CREATE DATASET IF NOT EXISTS {dataset_id()} (US)"]
+    for table_name, fields, partition_field in TABLE_SPECS:
+        partition = f", PARTITION BY {partition_field}" if partition_field else ""
+        plan.append(f"CREATE TABLE IF NOT EXISTS {table_name} ({len(fields)} columns{partition})")
+    return plan
+
+def main(dry_run=False):
     print("Setting up BigQuery dataset and tables...\n")
+    if dry_run:
+        for step in plan_setup():
+            print(f"  • {step}")
+        print("\n✅ Dry run OK (nothing created)")
+        return
     create_dataset()
     create_tables()
     print("\n✅ Setup complete! Ready to sync Shopify data.")
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,42 @@ Syncs Shopify data (products, inventory, orders, locations) to sync_data.json
 import os
 import time
 import json
+import queue
+import random
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from sync_rows import InventoryRow, SaleRow, VariantRow, encode_date, encode_row, intern_str
 
 load_dotenv()
 
+# Status codes worth retrying (throttled / transient server errors)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Longest Retry-After honored by default (SHOPIFY_MAX_RETRY_AFTER); longer requests fail fast
+DEFAULT_MAX_RETRY_AFTER = 300.0
+# Seconds paginate() waits for its fetch thread after the consumer stops
+PAGER_JOIN_TIMEOUT = 1.0
+
+# Sentinel put on the page queue once the cursor chain is exhausted
+_PAGES_DONE = object()
+
+
+class _FetchFailed:
+    """Carries an exception from the fetch thread to the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def shopify_ts(dt: datetime) -> str:
+    """UTC timestamp format for Shopify search queries."""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
 
 def gid_to_id(gid: str) -> str:
     return gid.split("/")[-1] if gid else ""
@@ -21,6 +51,67 @@ def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def parse_retry_after(value) -> float | None:
+    """Retry-After may be delta-seconds or an HTTP date; return seconds to wait (or None)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - utc_now()).total_seconds())
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after=None,
+    base: float = 1.0,
+    cap: float = 30.0,
+    max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+) -> float:
+    """
+    Honor the server's full Retry-After when present (plus a little jitter), else
+    full-jitter exponential backoff capped at `cap`. A Retry-After longer than
+    `max_retry_after` raises instead of stalling the sync on every retry.
+    """
+    server_delay = parse_retry_after(retry_after)
+    if server_delay is not None:
+        if server_delay > max_retry_after:
+            raise RuntimeError(
+                f"Retry-After of {server_delay:.0f}s exceeds SHOPIFY_MAX_RETRY_AFTER "
+                f"({max_retry_after:.0f}s); giving up instead of waiting"
+            )
+        return server_delay + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_throttled(data) -> bool:
+    """True if a GraphQL response was rejected by Shopify's cost-based rate limit."""
+    return any(
+        (err.get("extensions") or {}).get("code") == "THROTTLED"
+        for err in data.get("errors") or []
+        if isinstance(err, dict)
+    )
+
+
+def throttle_delay(data) -> float | None:
+    """Seconds until the bucket holds the requested query cost, from extensions.cost (or None)."""
+    cost = (data.get("extensions") or {}).get("cost") or {}
+    throttle = cost.get("throttleStatus") or {}
+    requested = cost.get("requestedQueryCost")
+    available = throttle.get("currentlyAvailable")
+    restore = throttle.get("restoreRate")
+    if not restore or requested is None or available is None:
+        return None
+    return max(1.0, (requested - available) / restore + 1)
+
+
 class ShopifySync:
     def __init__(self):
         self.shop_name = os.getenv("SHOPIFY_SHOP_NAME")
@@ -35,22 +126,67 @@ class ShopifySync:
         self.base_url = f"https://{self.shop_name}.myshopify.com/admin/api/{self.api_version}/graphql.json"
         self.headers = {
             "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
             "X-Shopify-Access-Token": self.access_token,
         }
 
+        self.max_retries = int(os.getenv("SHOPIFY_MAX_RETRIES", "5"))
+        self.max_retry_after = float(os.getenv("SHOPIFY_MAX_RETRY_AFTER", str(DEFAULT_MAX_RETRY_AFTER)))
+        self.pool_size = int(os.getenv("SHOPIFY_HTTP_POOL_SIZE", "4"))
+
+        # Pager tuning: how many raw pages may be fetched ahead of parsing, and the pause between pages
+        self.prefetch_pages = max(1, int(os.getenv("SHOPIFY_PREFETCH_PAGES", "2")))
+        self.page_delay = float(os.getenv("SHOPIFY_PAGE_DELAY", "0.25"))
+
+        # Shared throttle budget: when any request sees the bucket running low, every
+        # thread holds off until this monotonic deadline (matters for concurrent backfills).
+        self._budget_lock = threading.Lock()
+        self._budget_resume_at = 0.0
+
+        # One pooled keep-alive session for every page (reuses the TLS connection)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+
         # built during product sync: inventory_item_id -> variant_id
         self.inv_item_to_variant_id = {}
 
+    def wait_for_budget(self):
+        """Block until the shared query-cost budget has had time to restore."""
+        with self._budget_lock:
+            wait = self._budget_resume_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def reserve_budget_pause(self, sleep_sec: float):
+        """Push the shared resume deadline out so every thread waits for the bucket to refill."""
+        with self._budget_lock:
+            self._budget_resume_at = max(self._budget_resume_at, time.monotonic() + sleep_sec)
+
     def execute_query(self, query, variables=None):
-        """Execute GraphQL query with basic retry + helpful error prints."""
+        """Execute GraphQL query with jittered retry (honors Retry-After) + helpful error prints."""
         payload = {"query": query}
         if variables:
             payload["variables"] = variables
 
-        max_retries = 3
+        max_retries = self.max_retries
         for attempt in range(max_retries):
             try:
-                resp = requests.post(self.base_url, json=payload, headers=self.headers, timeout=60)
+                self.wait_for_budget()
+                resp = self.session.post(self.base_url, json=payload, timeout=60)
+
+                # Throttled / transient server error: wait as told (or back off) and retry
+                if resp.status_code in RETRYABLE_STATUS and attempt < max_retries - 1:
+                    delay = backoff_delay(
+                        attempt, resp.headers.get("Retry-After"), max_retry_after=self.max_retry_after
+                    )
+                    print(
+                        f"HTTP {resp.status_code} (attempt {attempt + 1}/{max_retries}), "
+                        f"retrying in {delay:.1f}s"
+                    )
+                    time.sleep(delay)
+                    continue
 
                 # Print useful context on non-2xx
                 if resp.status_code >= 400:
@@ -60,8 +196,13 @@ class ShopifySync:
                 resp.raise_for_status()
                 data = resp.json()
 
-                # GraphQL errors
+                # GraphQL errors (THROTTLED arrives as HTTP 200: wait for the bucket and retry)
                 if "errors" in data and data["errors"]:
+                    if is_throttled(data) and attempt < max_retries - 1:
+                        delay = throttle_delay(data) or backoff_delay(attempt)
+                        print(f"THROTTLED (attempt {attempt + 1}/{max_retries}), retrying in {delay:.1f}s")
+                        self.reserve_budget_pause(delay)
+                        continue
                     print(f"GraphQL errors: {data['errors']}")
                     return None
 
@@ -80,19 +221,97 @@ class ShopifySync:
                         if available < max(50, actual):
                             needed = max(0, max(50, actual) - available)
                             sleep_sec = max(1, int(needed / restore) + 1)
-                            time.sleep(sleep_sec)
+                            self.reserve_budget_pause(sleep_sec)
+                            self.wait_for_budget()
 
                 return data.get("data")
 
             except requests.exceptions.RequestException as e:
                 print(f"Request failed (attempt {attempt + 1}/{max_retries}): {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    time.sleep(backoff_delay(attempt))
                 else:
                     raise
 
         return None
 
+    def paginate(self, fetch_page, connection_of, parse_page, label="page", status=None):
+        """
+        Walk a cursor-paginated connection, yielding parse_page(connection) for each page.
+
+        A background thread follows endCursor and fetches the next page while the caller
+        is still parsing/storing the current one. Raw pages travel over a bounded queue
+        (SHOPIFY_PREFETCH_PAGES deep) so the fetcher never runs far ahead of the consumer.
+
+        fetch_page(cursor) -> GraphQL data
+        connection_of(data) -> connection dict with `edges` + `pageInfo` (or None to stop)
+        parse_page(connection) -> parsed rows for that page
+
+        A page that comes back empty after hasNextPage=true raises instead of ending the
+        walk early. If `status` (a dict) is given, status["complete"] is set to True only
+        once the chain ended with hasNextPage=false.
+        """
+        pages = queue.Queue(maxsize=self.prefetch_pages)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch_all():
+            cursor = None
+            page = 1
+            try:
+                while not stop.is_set():
+                    print(f"  Fetching {label} {page}...")
+                    data = fetch_page(cursor)
+                    connection = connection_of(data) if data else None
+                    if not connection:
+                        if page > 1:
+                            raise RuntimeError(
+                                f"{label} {page} returned no data after hasNextPage=true; "
+                                "results would be incomplete"
+                            )
+                        break
+                    if not put(connection):
+                        return
+
+                    page_info = connection["pageInfo"]
+                    if not page_info["hasNextPage"]:
+                        if status is not None:
+                            status["complete"] = True
+                        break
+
+                    cursor = page_info["endCursor"]
+                    page += 1
+                    time.sleep(self.page_delay)
+            except Exception as e:
+                put(_FetchFailed(e))
+                return
+            put(_PAGES_DONE)
+
+        fetcher = threading.Thread(target=fetch_all, name=f"shopify-pager-{label}", daemon=True)
+        fetcher.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is _PAGES_DONE:
+                    break
+                if isinstance(item, _FetchFailed):
+                    raise item.error
+                yield parse_page(item)
+        finally:
+            # Also reached when the consumer stops early or raises: signal the fetcher and
+            # give it a moment to exit, but don't block on an in-flight request (with
+            # retries that can take minutes); it is a daemon thread and stops at `stop`.
+            stop.set()
+            fetcher.join(timeout=PAGER_JOIN_TIMEOUT)
+
     # ---------------------------
     # GraphQL Fetchers
     # ---------------------------
@@ -175,7 +394,7 @@ class ShopifySync:
         variables = {"locationId": location_gid, "cursor": cursor}
         return self.execute_query(query, variables)
 
-    def fetch_orders(self, since_dt: datetime, cursor=None):
+    def fetch_orders(self, since_dt: datetime, cursor=None, until_dt: datetime | None = None):
         query = """
         query ($query: String!, $cursor: String) {
           orders(first: 250, query: $query, after: $cursor) {
@@ -206,10 +425,10 @@ class ShopifySync:
           }
         }
         """
-        # Use UTC timestamp format for Shopify query
-        since_utc = since_dt.astimezone(timezone.utc)
-        since_ts = since_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
-        query_string = f"created_at:>={since_ts}"
+        # Use UTC timestamp format for Shopify query; until_dt (exclusive) bounds a backfill slice
+        query_string = f"created_at:>={shopify_ts(since_dt)}"
+        if until_dt is not None:
+            query_string += f" created_at:<{shopify_ts(until_dt)}"
         variables = {"query": query_string, "cursor": cursor}
         return self.execute_query(query, variables)
 
@@ -217,64 +436,62 @@ class ShopifySync:
     # Sync Methods
     # ---------------------------
 
+    def parse_products_page(self, products):
+        """Products connection page -> (product dicts, VariantRows)."""
+        product_rows = []
+        variant_rows = []
+
+        for edge in products["edges"]:
+            product = edge["node"]
+            product_id = gid_to_id(product["id"])
+
+            product_rows.append(
+                {
+                    "product_id": product_id,
+                    "title": product.get("title"),
+                    "vendor": product.get("vendor"),
+                    "status": product.get("status"),
+                    "created_at": product.get("createdAt"),
+                    "updated_at": product.get("updatedAt"),
+                }
+            )
+
+            for v_edge in product["variants"]["edges"]:
+                v = v_edge["node"]
+                inv_item = v.get("inventoryItem") or {}
+                inv_item_id = gid_to_id(inv_item.get("id", ""))
+
+                variant_row = VariantRow(
+                    variant_id=intern_str(gid_to_id(v.get("id", ""))),
+                    product_id=product_id,
+                    sku=intern_str(v.get("sku") or ""),
+                    title=v.get("title"),
+                    price=float(v.get("price") or 0.0),
+                    inventory_item_id=inv_item_id,
+                )
+                variant_rows.append(variant_row)
+
+        return product_rows, variant_rows
+
     def sync_all_products(self):
         print("\n📦 Syncing products...")
         all_products = []
         all_variants = []
-        cursor = None
-        page = 1
-
-        while True:
-            print(f"  Fetching page {page}...")
-            data = self.fetch_products(cursor)
-            if not data or "products" not in data:
-                break
-
-            products = data["products"]
-
-            for edge in products["edges"]:
-                product = edge["node"]
-                product_id = gid_to_id(product["id"])
-
-                all_products.append(
-                    {
-                        "product_id": product_id,
-                        "title": product.get("title"),
-                        "vendor": product.get("vendor"),
-                        "status": product.get("status"),
-                        "created_at": product.get("createdAt"),
-                        "updated_at": product.get("updatedAt"),
-                    }
-                )
-
-                for v_edge in product["variants"]["edges"]:
-                    v = v_edge["node"]
-                    inv_item = v.get("inventoryItem") or {}
-                    inv_item_id = gid_to_id(inv_item.get("id", ""))
-
-                    variant_row = {
-                        "variant_id": gid_to_id(v.get("id", "")),
-                        "product_id": product_id,
-                        "sku": v.get("sku") or "",
-                        "title": v.get("title"),
-                        "price": float(v.get("price") or 0.0),
-                        "inventory_item_id": inv_item_id,
-                    }
-                    all_variants.append(variant_row)
-
-            page_info = products["pageInfo"]
-            if not page_info["hasNextPage"]:
-                break
 
-            cursor = page_info["endCursor"]
-            page += 1
-            time.sleep(0.25)
+        pages = self.paginate(
+            fetch_page=self.fetch_products,
+            connection_of=lambda data: data.get("products"),
+            parse_page=self.parse_products_page,
+        )
+        for product_rows, variant_rows in pages:
+            all_products.extend(product_rows)
+            all_variants.extend(variant_rows)
 
         # Build inventory_item_id -> variant_id mapping for inventory sync
         self.inv_item_to_variant_id = {
-            v["inventory_item_id"]: v["variant_id"]
+            v.inventory_item_id: v.variant_id
             for v in all_variants
-            if v.get("inventory_item_id") and v.get("variant_id")
+            if v.inventory_item_id and v.variant_id
         }
 
         print(f"  ✓ Synced {len(all_products)} products, {len(all_variants)} variants")
@@ -302,58 +519,59 @@ class ShopifySync:
         print(f"  ✓ Synced {len(locations)} locations")
         return locations
 
+    def parse_inventory_page(self, inv_levels, location_id, snapshot_day, snapshot_ts):
+        """InventoryLevels connection page -> InventoryRows (mapped to variant_id)."""
+        rows = []
+        for edge in inv_levels["edges"]:
+            node = edge["node"]
+            item = node.get("item")
+            if not item:
+                continue
+
+            inv_item_id = gid_to_id(item.get("id", ""))
+            sku = intern_str(item.get("sku") or "")
+
+            # Map inventory_item_id -> variant_id (from product sync)
+            variant_id = self.inv_item_to_variant_id.get(inv_item_id)
+            if not variant_id:
+                # If you want to keep records even when unmapped, remove this continue
+                continue
+
+            quantities = {q["name"]: q["quantity"] for q in (node.get("quantities") or [])}
+
+            rows.append(
+                InventoryRow(
+                    variant_id=variant_id,
+                    sku=sku,
+                    location_id=location_id,
+                    available_qty=int(quantities.get("available", 0) or 0),
+                    incoming_qty=int(quantities.get("incoming", 0) or 0),
+                    committed_qty=int(quantities.get("committed", 0) or 0),
+                    snapshot_day=snapshot_day,
+                    snapshot_timestamp=snapshot_ts,
+                )
+            )
+        return rows
+
     def sync_inventory_for_location(self, location_gid, location_id, location_name):
         print(f"  Syncing inventory for {location_name}...")
         all_inventory = []
-        cursor = None
 
         snapshot_dt = utc_now()
-        snapshot_date = snapshot_dt.date().isoformat()
+        snapshot_day = encode_date(snapshot_dt.date().isoformat())
         snapshot_ts = snapshot_dt.isoformat().replace("+00:00", "Z")
-
-        while True:
-            data = self.fetch_inventory_levels(location_gid, cursor)
-            if not data or not data.get("location"):
-                break
-
-            inv_levels = data["location"]["inventoryLevels"]
-            for edge in inv_levels["edges"]:
-                node = edge["node"]
-                item = node.get("item")
-                if not item:
-                    continue
-
-                inv_item_id = gid_to_id(item.get("id", ""))
-                sku = item.get("sku") or ""
-
-                # Map inventory_item_id -> variant_id (from product sync)
-                variant_id = self.inv_item_to_variant_id.get(inv_item_id)
-                if not variant_id:
-                    # If you want to keep records even when unmapped, remove this continue
-                    continue
-
-                quantities = {q["name"]: q["quantity"] for q in (node.get("quantities") or [])}
-
-                all_inventory.append(
-                    {
-                        "snapshot_id": f"{variant_id}_{location_id}_{snapshot_date}",
-                        "variant_id": variant_id,
-                        "sku": sku,
-                        "location_id": location_id,
-                        "available_qty": int(quantities.get("available", 0) or 0),
-                        "incoming_qty": int(quantities.get("incoming", 0) or 0),
-                        "committed_qty": int(quantities.get("committed", 0) or 0),
-                        "snapshot_date": snapshot_date,
-                        "snapshot_timestamp": snapshot_ts,
-                    }
-                )
-
-            page_info = inv_levels["pageInfo"]
-            if not page_info["hasNextPage"]:
-                break
-
-            cursor = page_info["endCursor"]
-            time.sleep(0.25)
+        location_id = intern_str(location_id)
+
+        pages = self.paginate(
+            fetch_page=lambda cursor: self.fetch_inventory_levels(location_gid, cursor),
+            connection_of=lambda data: (data.get("location") or {}).get("inventoryLevels"),
+            parse_page=lambda inv_levels: self.parse_inventory_page(
+                inv_levels, location_id, snapshot_day, snapshot_ts
+            ),
+            label="inventory page",
+        )
+        for rows in pages:
+            all_inventory.extend(rows)
 
         print(f"    ✓ {len(all_inventory)} inventory records")
         return all_inventory
@@ -375,85 +593,181 @@ class ShopifySync:
         print(f"  ✓ Total inventory records: {len(all_inventory)}")
         return all_inventory
 
-    def sync_orders(self, days_back=365):
-        print(f"\n🛒 Syncing orders (last {days_back} days)...")
-        all_sales = []
-        cursor = None
-        page = 1
+    def parse_orders_page(self, orders):
+        """Orders connection page -> SaleRows (one per line item, test/cancelled skipped)."""
+        rows = []
+        for edge in orders["edges"]:
+            order = edge["node"]
 
-        since_dt = utc_now() - timedelta(days=days_back)
+            # Skip test/cancelled orders
+            if order.get("test") or order.get("cancelledAt"):
+                continue
 
-        while True:
-            print(f"  Fetching page {page}...")
-            data = self.fetch_orders(since_dt, cursor)
-            if not data or "orders" not in data:
-                break
+            order_id = gid_to_id(order["id"])
+            order_name = order.get("name") or ""
 
-            orders = data["orders"]
-            for edge in orders["edges"]:
-                order = edge["node"]
+            created_at = order.get("createdAt")
+            order_dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+            sale_day = order_dt.date().toordinal()
+            sale_epoch = int(order_dt.timestamp())
 
-                # Skip test/cancelled orders
-                if order.get("test") or order.get("cancelledAt"):
+            for li_edge in order["lineItems"]["edges"]:
+                item = li_edge["node"]
+                variant = item.get("variant")
+                if not variant:
                     continue
 
-                order_id = gid_to_id(order["id"])
-                order_name = order.get("name") or ""
+                variant_id = intern_str(gid_to_id(variant.get("id", "")))
+                sku = intern_str(item.get("sku") or "")
+
+                vendor = ""
+                prod = variant.get("product") if variant else None
+                if prod and prod.get("vendor"):
+                    vendor = intern_str(prod["vendor"])
+
+                sale_id = f"{order_id}_{gid_to_id(item.get('id', ''))}"
+
+                rows.append(
+                    SaleRow(
+                        sale_id=sale_id,
+                        order_id=order_id,
+                        order_name=order_name,
+                        variant_id=variant_id,
+                        sku=sku,
+                        product_title=intern_str(item.get("title")),
+                        quantity_sold=int(item.get("quantity") or 0),
+                        sale_day=sale_day,
+                        sale_epoch=sale_epoch,
+                        vendor=vendor,
+                    )
+                )
+        return rows
 
-                created_at = order.get("createdAt")
-                order_dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                sale_date = order_dt.date().isoformat()
-                sale_ts = order_dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    def sync_orders(self, days_back=365):
+        print(f"\n🛒 Syncing orders (last {days_back} days)...")
+        all_sales = []
 
-                for li_edge in order["lineItems"]["edges"]:
-                    item = li_edge["node"]
-                    variant = item.get("variant")
-                    if not variant:
-                        continue
+        since_dt = utc_now() - timedelta(days=days_back)
 
-                    variant_id = gid_to_id(variant.get("id", ""))
-                    sku = item.get("sku") or ""
-
-                    vendor = ""
-                    prod = variant.get("product") if variant else None
-                    if prod and prod.get("vendor"):
-                        vendor = prod["vendor"]
-
-                    sale_id = f"{order_id}_{gid_to_id(item.get('id', ''))}"
-
-                    all_sales.append(
-                        {
-                            "sale_id": sale_id,
-                            "order_id": order_id,
-                            "order_name": order_name,
-                            "variant_id": variant_id,
-                            "sku": sku,
-                            "product_title": item.get("title"),
-                            "quantity_sold": int(item.get("quantity") or 0),
-                            "sale_date": sale_date,
-                            "sale_timestamp": sale_ts,
-                            "vendor": vendor,
-                        }
-                    )
+        pages = self.paginate(
+            fetch_page=lambda cursor: self.fetch_orders(since_dt, cursor),
+            connection_of=lambda data: data.get("orders"),
+            parse_page=self.parse_orders_page,
+        )
+        for rows in pages:
+            all_sales.extend(rows)
 
-            page_info = orders["pageInfo"]
-            if not page_info["hasNextPage"]:
-                break
+        print(f"  ✓ Synced {len(all_sales)} sales records")
+        return all_sales
 
-            cursor = page_info["endCursor"]
-            page += 1
-            time.sleep(0.25)
+    def sync_orders_window(self, since_dt: datetime, until_dt: datetime | None):
+        """
+        All sale rows for orders created in [since_dt, until_dt) (until_dt=None means up to now).
+        Raises unless the cursor chain ran to hasNextPage=false, so a failed or throttled
+        query can't pass for a complete (checkpointable) window.
+        """
+        label = f"orders {since_dt.date().isoformat()} page"
+        status = {"complete": False}
+        pages = self.paginate(
+            fetch_page=lambda cursor: self.fetch_orders(since_dt, cursor, until_dt=until_dt),
+            connection_of=lambda data: data.get("orders"),
+            parse_page=self.parse_orders_page,
+            label=label,
+            status=status,
+        )
+        rows = []
+        for page_rows in pages:
+            rows.extend(page_rows)
+        if not status["complete"]:
+            raise RuntimeError(f"{label} 1 returned no data; window {since_dt.date()} not fetched")
+        return rows
+
+    def backfill_orders(self, days_back=365, slice_days=7, workers=4, checkpoint_dir="backfill_checkpoints"):
+        """
+        Backfill orders as concurrent date slices instead of one long cursor chain.
+
+        The range is split into `slice_days` windows on a fixed grid (UTC epoch-day multiples of
+        `slice_days`; only the first slice is clipped to the start date), so closed slices keep
+        the same boundaries and checkpoint names when a backfill is resumed on a later day.
+        Slices are fetched by `workers` threads sharing one throttle budget. Each closed slice is checkpointed to `checkpoint_dir` only after its cursor
+        chain completed (a failed page raises instead); rerunning skips slices that already
+        have a checkpoint. The last slice is open-ended (up to now) and is always
+        re-fetched. Rows are merged and deduplicated on sale_id.
+        """
+        print(f"\n🛒 Backfilling orders (last {days_back} days, {slice_days}-day slices, {workers} workers)...")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        now = utc_now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=days_back)
+
+        # First grid boundary after start; every later boundary is a multiple of slice_days
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        grid_days = ((start - epoch).days // slice_days + 1) * slice_days
+        end = epoch + timedelta(days=grid_days)
+
+        windows = []
+        while start < now:
+            windows.append((start, end if end <= now else None))
+            start, end = end, end + timedelta(days=slice_days)
+
+        def checkpoint_path(since_dt, until_dt):
+            return os.path.join(
+                checkpoint_dir,
+                f"orders_{since_dt.date().isoformat()}_{until_dt.date().isoformat()}.json",
+            )
 
-        print(f"  ✓ Synced {len(all_sales)} sales records")
+        def run_slice(window):
+            since_dt, until_dt = window
+            path = checkpoint_path(since_dt, until_dt) if until_dt else None
+            if path and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    rows = [SaleRow.from_dict(d) for d in json.load(f)]
+                print(f"  ↺ {since_dt.date()}: {len(rows)} rows from checkpoint")
+                return rows
+
+            rows = self.sync_orders_window(since_dt, until_dt)
+            if path:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(rows, f, ensure_ascii=False, default=encode_row)
+                os.replace(tmp_path, path)
+            print(f"  ✓ {since_dt.date()}: {len(rows)} rows")
+            return rows
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="orders-backfill") as pool:
+            slice_rows = list(pool.map(run_slice, windows))
+
+        # Slices are half-open so overlaps should not happen, but dedupe anyway (last write wins)
+        merged = {}
+        for rows in slice_rows:
+            for row in rows:
+                merged[row.sale_id] = row
+        all_sales = list(merged.values())
+
+        print(f"  ✓ Backfilled {len(all_sales)} sales records from {len(windows)} slices")
         return all_sales
 
 
-if __name__ == "__main__":
+def main(dry_run=False):
     print("=" * 60)
     print("SHOPIFY DATA SYNC")
     print("=" * 60)
 
     syncer = ShopifySync()
+    out_path = os.getenv("SYNC_DATA_PATH", "sync_data.json")
+    orders_days_back = int(os.getenv("SHOPIFY_ORDERS_DAYS_BACK", "14"))
+    backfill = os.getenv("SHOPIFY_ORDERS_BACKFILL", "").lower() in ("1", "true", "yes")
+
+    if dry_run:
+        # Credentials/env already validated by ShopifySync(); no API calls.
+        mode = "backfill (date slices)" if backfill else "incremental"
+        print(f"\n🧪 Dry run: {syncer.base_url}")
+        print("  • products + variants, locations, inventory (active locations)")
+        print(f"  • orders: last {orders_days_back} days, {mode}")
+        print(f"  • output: {out_path}")
+        print("\n✅ Dry run OK (no requests sent)")
+        return
 
     products, variants = syncer.sync_all_products()
     locations = syncer.sync_all_locations()
@@ -461,8 +775,16 @@ if __name__ == "__main__":
 
     # Daily runs should be incremental for cost/perf.
     # First-time backfill: set SHOPIFY_ORDERS_DAYS_BACK=365 (or more) in your .env.
-    orders_days_back = int(os.getenv("SHOPIFY_ORDERS_DAYS_BACK", "14"))
-    sales = syncer.sync_orders(days_back=orders_days_back)
+    if backfill:
+        # Large backfills: parallel date slices with resumable on-disk checkpoints.
+        sales = syncer.backfill_orders(
+            days_back=orders_days_back,
+            slice_days=int(os.getenv("SHOPIFY_BACKFILL_SLICE_DAYS", "7")),
+            workers=int(os.getenv("SHOPIFY_BACKFILL_WORKERS", "4")),
+            checkpoint_dir=os.getenv("SHOPIFY_BACKFILL_DIR", "backfill_checkpoints"),
+        )
+    else:
+        sales = syncer.sync_orders(days_back=orders_days_back)
 
     print("\n" + "=" * 60)
     print("SYNC SUMMARY")
@@ -484,7 +806,6 @@ if __name__ == "__main__":
         for l in locations
     ]
 
-    out_path = os.getenv("SYNC_DATA_PATH", "sync_data.json")
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
 
     with open(out_path, "w", encoding="utf-8") as f:
@@ -499,6 +820,11 @@ if __name__ == "__main__":
             f,
             indent=2,
             ensure_ascii=False,
+            default=encode_row,
         )
 
     print(f"\n✅ Data saved to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
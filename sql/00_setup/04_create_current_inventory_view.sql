@@ -1,19 +1,39 @@
-CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.current_inventory` AS
+-- Shopify's `available` already excludes committed units; incoming (open POs) is
+-- tracked separately so restock can net it out instead of re-ordering it.
+
+-- Per variant x location (latest snapshot)
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.current_inventory_by_location` AS
 WITH latest_snapshot_date AS (
   SELECT MAX(snapshot_date) AS snapshot_date
   FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw`
   WHERE snapshot_date IS NOT NULL
-),
-inv AS (
+)
+SELECT
+  inv.snapshot_date,
+  inv.variant_id,
+  inv.location_id,
+  ANY_VALUE(NULLIF(inv.sku, '')) AS sku,
+  SUM(inv.available_qty) AS available_qty,
+  SUM(COALESCE(inv.incoming_qty, 0)) AS incoming_qty,
+  SUM(COALESCE(inv.committed_qty, 0)) AS committed_qty
+FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw` inv
+JOIN latest_snapshot_date ls
+  ON inv.snapshot_date = ls.snapshot_date
+GROUP BY inv.snapshot_date, inv.variant_id, inv.location_id;
+
+-- Per variant (rolled up across locations)
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.current_inventory` AS
+WITH inv AS (
   SELECT
-    inv.snapshot_date,
-    inv.variant_id,
-    ANY_VALUE(NULLIF(inv.sku, '')) AS sku,
-    SUM(inv.available_qty) AS raw_stock
-  FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw` inv
-  JOIN latest_snapshot_date ls
-    ON inv.snapshot_date = ls.snapshot_date
-  GROUP BY inv.snapshot_date, inv.variant_id
+    snapshot_date,
+    variant_id,
+    ANY_VALUE(sku) AS sku,
+    SUM(available_qty) AS raw_stock,
+    SUM(incoming_qty) AS incoming_qty,
+    SUM(committed_qty) AS committed_qty,
+    COUNTIF(available_qty < 0) AS negative_locations
+  FROM `fiesta-inventory-forecast.fiesta_inventory.current_inventory_by_location`
+  GROUP BY snapshot_date, variant_id
 )
 SELECT
   snapshot_date,
@@ -21,5 +41,9 @@ SELECT
   sku,
   raw_stock,
   GREATEST(raw_stock, 0) AS current_stock,
-  raw_stock < 0 AS negative_stock_flag
+  raw_stock < 0 AS negative_stock_flag,
+  incoming_qty,
+  committed_qty,
+  GREATEST(raw_stock, 0) + incoming_qty AS stock_position,
+  negative_locations
 FROM inv;
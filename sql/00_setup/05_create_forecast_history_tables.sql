@@ -0,0 +1,254 @@
+-- ============================================================
+-- 05_create_forecast_history_tables.sql
+-- Append-by-run layout for derived forecast / restock outputs
+--
+-- Each output is written to a *_history table (one partition per run_date, clustered
+-- on the join keys, 365-day partition expiry). `forecast_runs` holds the latest
+-- run_date per output, and set_latest_run() copies that run's partition into a small
+-- clustered *_latest table. The original table names become views over *_latest, so
+-- existing readers (Looker, restock SQL) keep working, history is kept for free, and a
+-- view read scans one run instead of every *_history partition (a run_date taken from
+-- a subquery would not prune partitions).
+--
+-- Writers:  DELETE this run's partition, INSERT, then CALL set_latest_run(...)
+-- Readers in scripts: DECLARE the run_date from forecast_runs and filter *_history
+--                     on it (partition-pruned); ad-hoc readers use the views.
+--
+-- One-time migration: the old plain tables (only if they are still BASE TABLEs) are
+-- copied into *_history as today's run, marked latest, then dropped.
+-- ============================================================
+
+DECLARE insert_columns STRING;
+DECLARE select_columns STRING;
+
+-- ---------- Latest-run pointer ----------
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.forecast_runs` (
+  table_name STRING NOT NULL,
+  run_date DATE NOT NULL,
+  updated_at TIMESTAMP
+);
+
+CREATE OR REPLACE PROCEDURE `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`(output_name STRING, output_run_date DATE)
+BEGIN
+  DECLARE cluster_by STRING DEFAULT (
+    SELECT STRING_AGG(column_name, ', ' ORDER BY clustering_ordinal_position)
+    FROM `fiesta-inventory-forecast.fiesta_inventory.INFORMATION_SCHEMA.COLUMNS`
+    WHERE table_name = CONCAT(output_name, '_history')
+      AND clustering_ordinal_position IS NOT NULL
+  );
+
+  -- Materialize this run (the parameter prunes *_history to one partition)
+  EXECUTE IMMEDIATE FORMAT("""
+    CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.%s_latest`
+    CLUSTER BY %s AS
+    SELECT * EXCEPT (run_date)
+    FROM `fiesta-inventory-forecast.fiesta_inventory.%s_history`
+    WHERE run_date = @run_date
+  """, output_name, cluster_by, output_name)
+  USING output_run_date AS run_date;
+
+  MERGE `fiesta-inventory-forecast.fiesta_inventory.forecast_runs` T
+  USING (SELECT output_name AS table_name, output_run_date AS run_date) S
+  ON T.table_name = S.table_name
+  WHEN MATCHED THEN UPDATE SET
+    run_date = S.run_date,
+    updated_at = CURRENT_TIMESTAMP()
+  WHEN NOT MATCHED THEN
+    INSERT (table_name, run_date, updated_at)
+    VALUES (S.table_name, S.run_date, CURRENT_TIMESTAMP());
+END;
+
+-- ---------- History tables ----------
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history` (
+  run_date DATE NOT NULL,
+  variant_id STRING,
+  sku STRING,
+  forecast_date DATE,
+  predicted_qty INT64,
+  confidence_lower INT64,
+  confidence_upper INT64,
+  created_at TIMESTAMP
+)
+PARTITION BY run_date
+CLUSTER BY variant_id, forecast_date
+OPTIONS (partition_expiration_days = 365);
+
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_history` (
+  run_date DATE NOT NULL,
+  variant_id STRING,
+  current_stock INT64,
+  stockout_date DATE,
+  days_remaining INT64,
+  created_at TIMESTAMP
+)
+PARTITION BY run_date
+CLUSTER BY variant_id
+OPTIONS (partition_expiration_days = 365);
+
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.vendor_restocks_weekly_history` (
+  run_date DATE NOT NULL,
+  vendor_name STRING,
+  variant_id STRING,
+  sku STRING,
+  product_title STRING,
+  variant_title STRING,
+  current_stock INT64,
+  raw_stock INT64,
+  negative_stock_flag BOOL,
+  incoming_qty INT64,
+  committed_qty INT64,
+  stock_position INT64,
+  lead_time_days INT64,
+  moq INT64,
+  pack_size INT64,
+  horizon_days INT64,
+  model_quality STRING,
+  expected_demand INT64,
+  demand_source STRING,
+  reorder_qty INT64,
+  expected_demand_forecast INT64,
+  expected_demand_fallback INT64,
+  snapshot_date DATE,
+  created_at TIMESTAMP
+)
+PARTITION BY run_date
+CLUSTER BY vendor_name, variant_id
+OPTIONS (partition_expiration_days = 365);
+
+-- Multi-location stock columns (for tables created before they existed)
+ALTER TABLE `fiesta-inventory-forecast.fiesta_inventory.vendor_restocks_weekly_history`
+  ADD COLUMN IF NOT EXISTS incoming_qty INT64,
+  ADD COLUMN IF NOT EXISTS committed_qty INT64,
+  ADD COLUMN IF NOT EXISTS stock_position INT64;
+
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_location_history` (
+  run_date DATE NOT NULL,
+  variant_id STRING,
+  location_id STRING,
+  current_stock INT64,
+  demand_share FLOAT64,
+  stockout_date DATE,
+  days_remaining INT64,
+  created_at TIMESTAMP
+)
+PARTITION BY run_date
+CLUSTER BY location_id, variant_id
+OPTIONS (partition_expiration_days = 365);
+
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w_history` (
+  run_date DATE NOT NULL,
+  variant_id STRING,
+  week_start DATE,
+  actual_qty INT64,
+  predicted_qty INT64,
+  baseline_qty INT64,
+  abs_error_pred INT64,
+  abs_error_base INT64,
+  created_at TIMESTAMP
+)
+PARTITION BY run_date
+CLUSTER BY variant_id
+OPTIONS (partition_expiration_days = 365);
+
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags_history` (
+  run_date DATE NOT NULL,
+  variant_id STRING,
+  wape FLOAT64,
+  baseline_wape FLOAT64,
+  sum_actual INT64,
+  model_quality STRING,
+  created_at TIMESTAMP
+)
+PARTITION BY run_date
+CLUSTER BY variant_id, model_quality
+OPTIONS (partition_expiration_days = 365);
+
+-- ---------- Migration: old plain output tables -> today's run in *_history ----------
+-- Columns are matched by name and cast to the history type, so older tables that lack
+-- a column (e.g. multi-location stock) still copy.
+FOR t IN (
+  SELECT table_name
+  FROM `fiesta-inventory-forecast.fiesta_inventory.INFORMATION_SCHEMA.TABLES`
+  WHERE table_type = 'BASE TABLE'
+    AND table_name IN (
+      'demand_forecasts', 'stockout_predictions', 'vendor_restocks_weekly',
+      'backtest_proof_4w', 'model_quality_flags'
+    )
+)
+DO
+  SET (insert_columns, select_columns) = (
+    SELECT AS STRUCT
+      STRING_AGG(h.column_name, ', ' ORDER BY h.ordinal_position),
+      STRING_AGG(
+        FORMAT('SAFE_CAST(%s AS %s)', h.column_name, h.data_type), ', '
+        ORDER BY h.ordinal_position
+      )
+    FROM `fiesta-inventory-forecast.fiesta_inventory.INFORMATION_SCHEMA.COLUMNS` h
+    JOIN `fiesta-inventory-forecast.fiesta_inventory.INFORMATION_SCHEMA.COLUMNS` o
+      ON o.table_name = t.table_name
+     AND o.column_name = h.column_name
+    WHERE h.table_name = CONCAT(t.table_name, '_history')
+      AND h.column_name != 'run_date'
+  );
+
+  EXECUTE IMMEDIATE FORMAT(
+    'DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.%s_history` WHERE run_date = CURRENT_DATE()',
+    t.table_name
+  );
+  EXECUTE IMMEDIATE FORMAT("""
+    INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.%s_history` (run_date, %s)
+    SELECT CURRENT_DATE(), %s
+    FROM `fiesta-inventory-forecast.fiesta_inventory.%s`
+  """, t.table_name, insert_columns, select_columns, t.table_name);
+  EXECUTE IMMEDIATE FORMAT(
+    'DROP TABLE `fiesta-inventory-forecast.fiesta_inventory.%s`', t.table_name
+  );
+  CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`(t.table_name, CURRENT_DATE());
+END FOR;
+
+-- ---------- *_latest tables ----------
+-- Missing *_latest tables: built from the recorded run if there is one, else created
+-- empty, so the views below always resolve. Writers keep them current afterwards.
+FOR o IN (
+  SELECT output_name, r.run_date
+  FROM UNNEST([
+    'demand_forecasts', 'stockout_predictions', 'stockout_predictions_location',
+    'vendor_restocks_weekly', 'backtest_proof_4w', 'model_quality_flags'
+  ]) AS output_name
+  LEFT JOIN `fiesta-inventory-forecast.fiesta_inventory.forecast_runs` r
+    ON r.table_name = output_name
+  WHERE CONCAT(output_name, '_latest') NOT IN (
+    SELECT table_name FROM `fiesta-inventory-forecast.fiesta_inventory.INFORMATION_SCHEMA.TABLES`
+  )
+)
+DO
+  IF o.run_date IS NOT NULL THEN
+    CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`(o.output_name, o.run_date);
+  ELSE
+    EXECUTE IMMEDIATE FORMAT("""
+      CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.%s_latest` AS
+      SELECT * EXCEPT (run_date)
+      FROM `fiesta-inventory-forecast.fiesta_inventory.%s_history`
+      WHERE FALSE
+    """, o.output_name, o.output_name);
+  END IF;
+END FOR;
+
+-- ---------- Latest-run views (original names) ----------
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts` AS
+SELECT * FROM `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_latest`;
+
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions` AS
+SELECT * FROM `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_latest`;
+
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_location` AS
+SELECT * FROM `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_location_latest`;
+
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.vendor_restocks_weekly` AS
+SELECT * FROM `fiesta-inventory-forecast.fiesta_inventory.vendor_restocks_weekly_latest`;
+
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w` AS
+SELECT * FROM `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w_latest`;
+
+CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags` AS
+SELECT * FROM `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags_latest`;
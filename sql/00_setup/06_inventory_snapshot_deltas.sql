@@ -0,0 +1,73 @@
+-- ============================================================
+-- 06_inventory_snapshot_deltas.sql
+-- Delta-encoded inventory history + "stock as of date D"
+--
+-- inventory_snapshots_raw stores a full row per (variant, location) per day, even when
+-- nothing moved. inventory_snapshot_deltas stores only what changed:
+--   - keyframe rows   (is_keyframe = TRUE)  full state, written every INVENTORY_KEYFRAME_DAYS
+--   - change rows                            new/changed (variant, location) quantities
+--   - tombstones      (is_deleted = TRUE)    pair disappeared from the snapshot
+-- so storage scales with inventory movement and history can outlive raw's 365 days.
+--
+-- inventory_as_of(D) rebuilds the full state: last keyframe on/before D, then the latest
+-- row per (variant, location) up to D. It scans at most 35 days of partitions, so
+-- keyframes must be written at least every 28 days (loader default: 7).
+--
+-- This file is the single definition of the table + function: load_to_bigquery.py runs
+-- it as-is (dataset substituted) before writing deltas when INVENTORY_SNAPSHOT_MODE=delta.
+-- Backfill from raw history (also after the loader started writing deltas):
+-- 08_backfill_inventory_snapshot_deltas.sql.
+--
+-- Usage:
+--   SELECT * FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_as_of`(DATE '2025-01-31');
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshot_deltas` (
+  snapshot_date DATE NOT NULL,
+  variant_id STRING,
+  location_id STRING,
+  sku STRING,
+  available_qty INT64,
+  incoming_qty INT64,
+  committed_qty INT64,
+  snapshot_timestamp TIMESTAMP,
+  is_keyframe BOOL,
+  is_deleted BOOL
+)
+PARTITION BY snapshot_date
+CLUSTER BY variant_id, location_id
+OPTIONS (require_partition_filter = TRUE, partition_expiration_days = 1825);
+
+CREATE OR REPLACE TABLE FUNCTION `fiesta-inventory-forecast.fiesta_inventory.inventory_as_of`(as_of DATE) AS
+WITH window_rows AS (
+  SELECT *
+  FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshot_deltas`
+  WHERE snapshot_date BETWEEN DATE_SUB(as_of, INTERVAL 35 DAY) AND as_of   -- ✅ partition filter
+),
+keyframe AS (
+  SELECT MAX(snapshot_date) AS keyframe_date
+  FROM window_rows
+  WHERE is_keyframe
+),
+latest AS (
+  SELECT w.*
+  FROM window_rows w
+  CROSS JOIN keyframe k
+  WHERE w.snapshot_date >= k.keyframe_date
+  QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY w.variant_id, w.location_id
+    ORDER BY w.snapshot_date DESC
+  ) = 1
+)
+SELECT
+  as_of AS as_of_date,
+  snapshot_date AS last_changed_date,
+  variant_id,
+  location_id,
+  sku,
+  available_qty,
+  incoming_qty,
+  committed_qty,
+  snapshot_timestamp
+FROM latest
+WHERE NOT is_deleted;
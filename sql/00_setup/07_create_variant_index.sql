@@ -0,0 +1,123 @@
+-- ============================================================
+-- 07_create_variant_index.sql
+-- Shared variant lookup index: variant_id -> product / vendor / vendor settings
+--
+-- One materialized row per variant (with a non-empty vendor) carrying everything the
+-- stages used to re-join from variants + products + vendors + vendor_status + cadence:
+--   sku, titles, price, vendor_name, lead_time_days / moq / pack_size (defaults applied),
+--   restock_frequency_days, has_vendor_settings, has_vendor_status, vendor_archived,
+--   is_internal_vendor, is_active
+--
+-- is_active = vendor listed in vendor_status, not archived, and not the internal
+-- 'Fiesta Carnival' vendor (the filter validation + restock apply). Vendors missing from
+-- vendor_status are inactive, as with the old inner join on vendor_status.
+-- Looker views use has_vendor_status AND NOT vendor_archived; restock also requires
+-- has_vendor_settings (a vendors row), so the defaults below only fill NULL settings.
+--
+-- Refresh: CALL ensure_variant_index() rebuilds only when one of the source tables was
+-- modified after the index (metadata lookup, no scan). The loader calls it after the
+-- dimension load, and 30_forecasting/00_prepare_sales.sql / vendor setup call it before
+-- reading the index.
+-- Python: variant_index.VariantIndex is the same lookup held in memory.
+-- ============================================================
+
+-- ---------- Sources that may not exist before vendor setup ran ----------
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.vendor_status` (
+  vendor_name STRING NOT NULL,
+  archived BOOL,
+  archived_at TIMESTAMP,
+  note STRING
+);
+
+CREATE TABLE IF NOT EXISTS `fiesta-inventory-forecast.fiesta_inventory.vendor_restock_cadence_one_time` (
+  vendor_name STRING,
+  revenue_rank INT64,
+  vendor_revenue_6m FLOAT64,
+  vendor_units_sold_6m INT64,
+  restock_frequency_days INT64,
+  frozen_as_of_date DATE
+);
+
+-- ---------- Rebuild ----------
+CREATE OR REPLACE PROCEDURE `fiesta-inventory-forecast.fiesta_inventory.refresh_variant_index`()
+BEGIN
+  CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.variant_index`
+  CLUSTER BY variant_id, vendor_name AS
+  WITH vendor_settings AS (
+    SELECT
+      vendor_name,
+      ANY_VALUE(vendor_id) AS vendor_id,
+      ANY_VALUE(lead_time_days) AS lead_time_days,
+      ANY_VALUE(moq) AS moq,
+      ANY_VALUE(pack_size) AS pack_size
+    FROM `fiesta-inventory-forecast.fiesta_inventory.vendors`
+    GROUP BY vendor_name
+  ),
+  status AS (
+    SELECT vendor_name, LOGICAL_OR(COALESCE(archived, FALSE)) AS archived
+    FROM `fiesta-inventory-forecast.fiesta_inventory.vendor_status`
+    GROUP BY vendor_name
+  ),
+  cadence AS (
+    SELECT vendor_name, MIN(restock_frequency_days) AS restock_frequency_days
+    FROM `fiesta-inventory-forecast.fiesta_inventory.vendor_restock_cadence_one_time`
+    GROUP BY vendor_name
+  )
+  SELECT
+    v.variant_id,
+    v.product_id,
+    NULLIF(v.sku, '') AS sku,
+    p.title AS product_title,
+    v.title AS variant_title,
+    SAFE_CAST(v.price AS FLOAT64) AS price,
+    p.vendor AS vendor_name,
+    vs.vendor_id,
+    COALESCE(vs.lead_time_days, 5) AS lead_time_days,
+    COALESCE(vs.moq, 6) AS moq,
+    COALESCE(vs.pack_size, 6) AS pack_size,
+    c.restock_frequency_days,
+    vs.vendor_name IS NOT NULL AS has_vendor_settings,
+    st.vendor_name IS NOT NULL AS has_vendor_status,
+    COALESCE(st.archived, FALSE) AS vendor_archived,
+    p.vendor = 'Fiesta Carnival' AS is_internal_vendor,
+    st.vendor_name IS NOT NULL AND NOT st.archived AND p.vendor <> 'Fiesta Carnival' AS is_active,
+    CURRENT_TIMESTAMP() AS refreshed_at
+  FROM `fiesta-inventory-forecast.fiesta_inventory.variants` v
+  JOIN `fiesta-inventory-forecast.fiesta_inventory.products` p
+    ON v.product_id = p.product_id
+  LEFT JOIN vendor_settings vs
+    ON vs.vendor_name = p.vendor
+  LEFT JOIN status st
+    ON st.vendor_name = p.vendor
+  LEFT JOIN cadence c
+    ON c.vendor_name = p.vendor
+  WHERE v.variant_id IS NOT NULL AND v.variant_id != ''
+    AND p.vendor IS NOT NULL AND p.vendor != ''
+  QUALIFY ROW_NUMBER() OVER (PARTITION BY v.variant_id ORDER BY p.product_id) = 1;
+END;
+
+-- ---------- Rebuild only if a source changed after the index ----------
+CREATE OR REPLACE PROCEDURE `fiesta-inventory-forecast.fiesta_inventory.ensure_variant_index`()
+BEGIN
+  DECLARE sources_modified INT64 DEFAULT (
+    SELECT MAX(last_modified_time)
+    FROM `fiesta-inventory-forecast.fiesta_inventory.__TABLES__`
+    WHERE table_id IN (
+      'variants', 'products', 'vendors', 'vendor_status', 'vendor_restock_cadence_one_time'
+    )
+  );
+  DECLARE index_modified INT64 DEFAULT (
+    SELECT MAX(last_modified_time)
+    FROM `fiesta-inventory-forecast.fiesta_inventory.__TABLES__`
+    WHERE table_id = 'variant_index'
+  );
+
+  IF index_modified IS NULL OR sources_modified > index_modified THEN
+    CALL `fiesta-inventory-forecast.fiesta_inventory.refresh_variant_index`();
+  END IF;
+END;
+
+-- ---------- Migration: variant_vendor_map is replaced by variant_index ----------
+DROP TABLE IF EXISTS `fiesta-inventory-forecast.fiesta_inventory.variant_vendor_map`;
+
+CALL `fiesta-inventory-forecast.fiesta_inventory.ensure_variant_index`();
@@ -0,0 +1,144 @@
+-- ============================================================
+-- 08_backfill_inventory_snapshot_deltas.sql
+-- Backfill of inventory_snapshot_deltas from inventory_snapshots_raw
+--
+-- Run after 06_inventory_snapshot_deltas.sql (table + inventory_as_of function), before
+-- raw history is shortened. keyframe_days should match INVENTORY_KEYFRAME_DAYS.
+--
+-- Replays only raw dates before the earliest existing delta, so it still fills history
+-- when the loader already started writing deltas (its first day is a keyframe), and is
+-- safe to re-run. Keyframes sit on a fixed calendar grid (epoch-day multiples of
+-- keyframe_days) and carry the latest raw state on/before that day, so they are never
+-- more than keyframe_days apart even across gaps in raw.
+-- ============================================================
+
+DECLARE keyframe_days INT64 DEFAULT 7;
+DECLARE replay_before DATE DEFAULT (
+  SELECT COALESCE(MIN(snapshot_date), DATE_ADD(CURRENT_DATE(), INTERVAL 1 DAY))
+  FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshot_deltas`
+  WHERE snapshot_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 1825 DAY)   -- ✅ partition filter
+);
+
+IF keyframe_days NOT BETWEEN 1 AND 28 THEN
+  RAISE USING MESSAGE = 'keyframe_days must be between 1 and 28 (inventory_as_of looks back 35 days)';
+END IF;
+
+INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshot_deltas` (
+  snapshot_date, variant_id, location_id, sku,
+  available_qty, incoming_qty, committed_qty, snapshot_timestamp,
+  is_keyframe, is_deleted
+)
+WITH state AS (
+  SELECT snapshot_date, variant_id, location_id, sku,
+         available_qty, incoming_qty, committed_qty, snapshot_timestamp
+  FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw`
+  WHERE snapshot_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 365 DAY)   -- ✅ partition filter
+    AND snapshot_date < replay_before
+  QUALIFY ROW_NUMBER() OVER (
+    PARTITION BY snapshot_date, variant_id, location_id
+    ORDER BY snapshot_timestamp DESC
+  ) = 1
+),
+days AS (
+  SELECT
+    snapshot_date,
+    LAG(snapshot_date) OVER (ORDER BY snapshot_date) AS prev_date
+  FROM (SELECT DISTINCT snapshot_date FROM state)
+),
+bounds AS (
+  SELECT MIN(snapshot_date) AS first_date
+  FROM days
+),
+-- Grid dates from the first replayed date up to replay_before, plus the first date itself
+-- (nothing before it to diff against)
+keyframe_dates AS (
+  SELECT keyframe_date
+  FROM bounds b,
+  UNNEST(GENERATE_DATE_ARRAY(
+    DATE_ADD(
+      DATE '1970-01-01',
+      INTERVAL DIV(DATE_DIFF(b.first_date, DATE '1970-01-01', DAY) + keyframe_days - 1, keyframe_days)
+               * keyframe_days DAY
+    ),
+    DATE_SUB(replay_before, INTERVAL 1 DAY),   -- up to the existing deltas (or today)
+    INTERVAL keyframe_days DAY
+  )) AS keyframe_date
+  UNION DISTINCT
+  SELECT first_date FROM bounds WHERE first_date IS NOT NULL
+),
+-- Each keyframe copies the latest raw day on/before it (carries state across gaps)
+keyframe_sources AS (
+  SELECT k.keyframe_date, MAX(d.snapshot_date) AS source_date
+  FROM keyframe_dates k
+  JOIN days d
+    ON d.snapshot_date <= k.keyframe_date
+  GROUP BY k.keyframe_date
+),
+keyframes AS (
+  SELECT
+    k.keyframe_date AS snapshot_date,
+    s.variant_id, s.location_id, s.sku,
+    s.available_qty, s.incoming_qty, s.committed_qty, s.snapshot_timestamp,
+    TRUE AS is_keyframe,
+    FALSE AS is_deleted
+  FROM keyframe_sources k
+  JOIN state s
+    ON s.snapshot_date = k.source_date
+),
+-- Other raw days: changes vs the previous raw day (a keyframe in between holds that state)
+changes AS (
+  SELECT
+    s.snapshot_date,
+    s.variant_id, s.location_id, s.sku,
+    s.available_qty, s.incoming_qty, s.committed_qty, s.snapshot_timestamp,
+    FALSE AS is_keyframe,
+    FALSE AS is_deleted
+  FROM state s
+  JOIN days d
+    ON d.snapshot_date = s.snapshot_date
+  LEFT JOIN state p
+    ON p.snapshot_date = d.prev_date
+   AND p.variant_id = s.variant_id
+   AND p.location_id = s.location_id
+  WHERE d.snapshot_date NOT IN (SELECT keyframe_date FROM keyframe_dates)
+    AND (
+      p.variant_id IS NULL
+      OR s.available_qty IS DISTINCT FROM p.available_qty
+      OR s.incoming_qty IS DISTINCT FROM p.incoming_qty
+      OR s.committed_qty IS DISTINCT FROM p.committed_qty
+    )
+),
+tombstones AS (
+  SELECT
+    d.snapshot_date,
+    p.variant_id,
+    p.location_id,
+    p.sku,
+    CAST(NULL AS INT64) AS available_qty,
+    CAST(NULL AS INT64) AS incoming_qty,
+    CAST(NULL AS INT64) AS committed_qty,
+    CAST(NULL AS TIMESTAMP) AS snapshot_timestamp,
+    FALSE AS is_keyframe,
+    TRUE AS is_deleted
+  FROM state p
+  JOIN days d
+    ON d.prev_date = p.snapshot_date
+  LEFT JOIN state s
+    ON s.snapshot_date = d.snapshot_date
+   AND s.variant_id = p.variant_id
+   AND s.location_id = p.location_id
+  WHERE d.snapshot_date NOT IN (SELECT keyframe_date FROM keyframe_dates)
+    AND s.variant_id IS NULL
+)
+SELECT * FROM keyframes
+UNION ALL
+SELECT * FROM changes
+UNION ALL
+SELECT * FROM tombstones;
+
+-- ---------- Optional: shrink raw once deltas are trusted ----------
+-- Deltas are written in addition to raw, so until raw retention is shortened delta mode
+-- adds storage. The loader applies INVENTORY_RAW_RETENTION_DAYS (>= 35) in delta mode;
+-- the equivalent one-off statement is:
+-- ALTER TABLE `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw`
+-- SET OPTIONS (partition_expiration_days = 35);
@@ -1,33 +1,26 @@
+-- Requires 00_setup/07_create_variant_index.sql (variant -> vendor + price lookup)
+CALL `fiesta-inventory-forecast.fiesta_inventory.ensure_variant_index`();
+
 -- One-time vendor revenue ranking (last 6 months)
 CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.vendor_sales_rank_one_time` AS
-WITH sku_vendor_price AS (
-  SELECT
-    v.sku,
-    p.vendor AS vendor_name,
-    SAFE_CAST(v.price AS FLOAT64) AS unit_price
-  FROM `fiesta-inventory-forecast.fiesta_inventory.variants` v
-  JOIN `fiesta-inventory-forecast.fiesta_inventory.products` p
-    ON v.product_id = p.product_id
-  WHERE v.sku IS NOT NULL AND v.sku != ''
-    AND p.vendor IS NOT NULL AND p.vendor != ''
-),
-sales_6m AS (
+WITH sales_6m AS (
   SELECT
-    sh.sku,
+    sh.variant_id,
     SUM(sh.quantity_sold) AS units_sold_6m
   FROM `fiesta-inventory-forecast.fiesta_inventory.sales_history_raw` sh
   WHERE sh.sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 6 MONTH)
-    AND sh.sku IS NOT NULL AND sh.sku != ''
-  GROUP BY sh.sku
+    AND sh.variant_id IS NOT NULL AND sh.variant_id != ''
+  GROUP BY sh.variant_id
 ),
 vendor_sales AS (
   SELECT
-    svp.vendor_name,
+    vi.vendor_name,
     SUM(s.units_sold_6m) AS vendor_units_sold_6m,
-    SUM(s.units_sold_6m * COALESCE(svp.unit_price, 0)) AS vendor_revenue_6m
+    SUM(s.units_sold_6m * COALESCE(vi.price, 0)) AS vendor_revenue_6m
   FROM sales_6m s
-  JOIN sku_vendor_price svp USING (sku)
-  GROUP BY svp.vendor_name
+  JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_index` vi
+    ON vi.variant_id = s.variant_id
+  GROUP BY vi.vendor_name
 )
 SELECT
   vendor_name,
@@ -108,6 +101,9 @@ WHEN NOT MATCHED THEN
   INSERT (vendor_name, archived, archived_at, note)
   VALUES (S.vendor_name, FALSE, NULL, NULL);
 
+-- Pick up the new vendor defaults / cadence / status in the shared index
+CALL `fiesta-inventory-forecast.fiesta_inventory.ensure_variant_index`();
+
 /*
 -- How to archive a vendor
 UPDATE `fiesta-inventory-forecast.fiesta_inventory.vendor_status`
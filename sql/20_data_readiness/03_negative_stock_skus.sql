@@ -8,30 +8,32 @@ SET latest_snapshot_date = (
 
 CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.negative_stock_skus` AS
 WITH variant_vendor AS (
-  SELECT
-    v.variant_id,
-    ANY_VALUE(NULLIF(v.sku, '')) AS sku,          -- label only
-    p.vendor AS vendor_name,
-    p.title AS product_title,
-    v.title AS variant_title
-  FROM `fiesta-inventory-forecast.fiesta_inventory.variants` v
-  JOIN `fiesta-inventory-forecast.fiesta_inventory.products` p
-    ON v.product_id = p.product_id
-  WHERE v.variant_id IS NOT NULL
-    AND p.vendor IS NOT NULL AND p.vendor != ''
-    AND p.vendor <> 'Fiesta Carnival'             -- exclude internal vendor
-  GROUP BY v.variant_id, p.vendor, p.title, v.title
+  SELECT variant_id, sku, vendor_name, product_title, variant_title
+  FROM `fiesta-inventory-forecast.fiesta_inventory.variant_index`
+  WHERE NOT is_internal_vendor                    -- exclude internal vendor
 ),
-neg AS (
+by_location AS (
   SELECT
     inv.variant_id,
+    inv.location_id,
     ANY_VALUE(NULLIF(inv.sku, '')) AS sku,        -- label only
-    SUM(inv.available_qty) AS raw_stock
+    SUM(inv.available_qty) AS available_qty
   FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw` inv
   WHERE inv.snapshot_date = latest_snapshot_date
     AND inv.variant_id IS NOT NULL
-  GROUP BY inv.variant_id
-  HAVING raw_stock < 0
+  GROUP BY inv.variant_id, inv.location_id
+),
+-- Negative at any location counts, even if another location's stock offsets the total
+neg AS (
+  SELECT
+    variant_id,
+    ANY_VALUE(sku) AS sku,
+    SUM(available_qty) AS raw_stock,
+    COUNTIF(available_qty < 0) AS negative_locations,
+    STRING_AGG(IF(available_qty < 0, location_id, NULL), ',' ORDER BY location_id) AS negative_location_ids
+  FROM by_location
+  GROUP BY variant_id
+  HAVING raw_stock < 0 OR negative_locations > 0
 )
 SELECT
   latest_snapshot_date AS snapshot_date,
@@ -41,6 +43,8 @@ SELECT
   vv.product_title,
   vv.variant_title,
   n.raw_stock,
+  n.negative_locations,
+  n.negative_location_ids,
   CURRENT_TIMESTAMP() AS created_at
 FROM neg n
 JOIN variant_vendor vv
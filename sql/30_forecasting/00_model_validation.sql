@@ -3,16 +3,19 @@
 -- Weekly self-validation (backtest) for demand forecasting (WEEKLY granularity)
 -- Excludes vendor_name = 'Fiesta Carnival' and archived vendors
 --
+-- Assumes 00_prepare_sales.sql ran first (sales_daily + variant_index).
+-- Only needed for forecast_mode 'VARIANT'; the hierarchical restock gates on
+-- hierarchical_quality_flags from 03_hierarchical_demand_forecasts.sql instead.
+--
 -- Outputs:
---   - sales_daily
---   - variant_vendor_map
 --   - sales_weekly
 --   - demand_arima_backtest_weekly (MODEL)
 --   - backtest_forecast_4w
 --   - backtest_metrics_variant_4w
 --   - backtest_baseline_4w
---   - backtest_proof_4w             <-- used by Looker "proof" time series
---   - model_quality_flags           <-- used by restock SQL
+--   - backtest_proof_4w_history     <-- used by Looker "proof" time series (view: backtest_proof_4w)
+--   - model_quality_flags_history   <-- used by restock SQL (view: model_quality_flags)
+--   (history tables are appended per run_date; see 00_setup/05_create_forecast_history_tables.sql)
 -- ============================================================
 
 -- ---------- Parameters ----------
@@ -20,49 +23,13 @@ DECLARE holdout_weeks INT64 DEFAULT 4;
 DECLARE last_complete_week_start DATE;
 DECLARE cutoff_week_start DATE;
 DECLARE train_rows INT64;
+DECLARE this_run_date DATE DEFAULT CURRENT_DATE();
 
 -- Monday-based weeks. Change to WEEK(SUNDAY) if desired.
 SET last_complete_week_start = DATE_TRUNC(DATE_SUB(CURRENT_DATE(), INTERVAL 1 WEEK), WEEK(MONDAY));
 SET cutoff_week_start = DATE_SUB(last_complete_week_start, INTERVAL holdout_weeks WEEK);
 
--- ---------- Active vendors ----------
-CREATE OR REPLACE TEMP TABLE active_vendors AS
-SELECT vendor_name
-FROM `fiesta-inventory-forecast.fiesta_inventory.vendor_status`
-WHERE COALESCE(archived, FALSE) = FALSE
-  AND vendor_name <> 'Fiesta Carnival';
-
--- ---------- Canonical variant -> vendor map ----------
-CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.variant_vendor_map` AS
-SELECT
-  v.variant_id,
-  v.sku,
-  p.vendor AS vendor_name
-FROM `fiesta-inventory-forecast.fiesta_inventory.variants` v
-JOIN `fiesta-inventory-forecast.fiesta_inventory.products` p
-  ON v.product_id = p.product_id
-JOIN active_vendors av
-  ON av.vendor_name = p.vendor
-WHERE v.variant_id IS NOT NULL AND v.variant_id != ''
-  AND p.vendor IS NOT NULL AND p.vendor != '';
-
--- ---------- 0) sales_daily (DROP+CREATE to change clustering to variant_id) ----------
-DROP TABLE IF EXISTS `fiesta-inventory-forecast.fiesta_inventory.sales_daily`;
-
-CREATE TABLE `fiesta-inventory-forecast.fiesta_inventory.sales_daily`
-PARTITION BY sale_date
-CLUSTER BY variant_id AS
-SELECT
-  sale_date,
-  variant_id,
-  ANY_VALUE(sku) AS sku,               -- label only
-  SUM(quantity_sold) AS qty_sold
-FROM `fiesta-inventory-forecast.fiesta_inventory.sales_history_raw`
-WHERE sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 365 DAY)   -- ✅ partition filter
-  AND variant_id IS NOT NULL AND variant_id != ''
-GROUP BY sale_date, variant_id;
-
--- ---------- 0b) sales_weekly ----------
+-- ---------- 0) sales_weekly ----------
 DROP TABLE IF EXISTS `fiesta-inventory-forecast.fiesta_inventory.sales_weekly`;
 
 CREATE TABLE `fiesta-inventory-forecast.fiesta_inventory.sales_weekly`
@@ -74,9 +41,10 @@ SELECT
   ANY_VALUE(sd.sku) AS sku,
   SUM(sd.qty_sold) AS qty_sold
 FROM `fiesta-inventory-forecast.fiesta_inventory.sales_daily` sd
-JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_vendor_map` vvm
-  ON vvm.variant_id = sd.variant_id
+JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_index` vi
+  ON vi.variant_id = sd.variant_id
 WHERE sd.sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 365 DAY)
+  AND vi.is_active
 GROUP BY week_start, variant_id;
 
 -- ---------- Guard: training rows ----------
@@ -112,28 +80,12 @@ IF train_rows = 0 THEN
     CAST(NULL AS INT64) AS sum_actual_holdout
   WHERE FALSE;
 
-  CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w` AS
-  SELECT
-    CAST(NULL AS STRING) AS variant_id,
-    CAST(NULL AS DATE) AS week_start,
-    CAST(NULL AS INT64) AS actual_qty,
-    CAST(NULL AS INT64) AS predicted_qty,
-    CAST(NULL AS INT64) AS baseline_qty,
-    CAST(NULL AS INT64) AS abs_error_pred,
-    CAST(NULL AS INT64) AS abs_error_base,
-    CURRENT_TIMESTAMP() AS created_at
-  WHERE FALSE;
+  -- Empty run partitions (pointer still moves, so the views read as empty)
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w_history`
+  WHERE run_date = this_run_date;
 
-  CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags` AS
-  SELECT
-    vvm.variant_id,
-    CAST(NULL AS FLOAT64) AS wape,
-    CAST(NULL AS FLOAT64) AS baseline_wape,
-    CAST(NULL AS INT64) AS sum_actual,
-    'NO_DATA' AS model_quality,
-    CURRENT_TIMESTAMP() AS created_at
-  FROM `fiesta-inventory-forecast.fiesta_inventory.variant_vendor_map` vvm
-  WHERE FALSE;
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags_history`
+  WHERE run_date = this_run_date;
 
 ELSE
 
@@ -243,7 +195,13 @@ ELSE
   GROUP BY variant_id;
 
   -- ---------- 4b) Proof table: actual vs predicted vs baseline (weekly rows) ----------
-  CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w` AS
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w_history`
+  WHERE run_date = this_run_date;
+
+  INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.backtest_proof_4w_history` (
+    run_date, variant_id, week_start, actual_qty, predicted_qty, baseline_qty,
+    abs_error_pred, abs_error_base, created_at
+  )
   WITH actual AS (
     SELECT
       CAST(variant_id AS STRING) AS variant_id,
@@ -282,6 +240,7 @@ ELSE
      AND a.week_start = p.week_start
   )
   SELECT
+    this_run_date AS run_date,
     j.variant_id,
     j.week_start,
     j.actual_qty,
@@ -296,7 +255,12 @@ ELSE
    AND bl.week_start = j.week_start;
 
   -- ---------- 5) Final quality flags ----------
-  CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags` AS
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags_history`
+  WHERE run_date = this_run_date;
+
+  INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags_history` (
+    run_date, variant_id, wape, baseline_wape, sum_actual, model_quality, created_at
+  )
   WITH m AS (
     SELECT variant_id, wape, sum_actual
     FROM `fiesta-inventory-forecast.fiesta_inventory.backtest_metrics_variant_4w`
@@ -306,6 +270,7 @@ ELSE
     FROM `fiesta-inventory-forecast.fiesta_inventory.backtest_baseline_4w`
   )
   SELECT
+    this_run_date AS run_date,
     m.variant_id,
     m.wape,
     b.baseline_wape,
@@ -324,4 +289,8 @@ ELSE
   LEFT JOIN b
     ON m.variant_id = b.variant_id;
 
-END IF;
\ No newline at end of file
+END IF;
+
+-- ---------- Point readers at this run ----------
+CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('backtest_proof_4w', this_run_date);
+CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('model_quality_flags', this_run_date);
\ No newline at end of file
@@ -0,0 +1,28 @@
+-- ============================================================
+-- 00_prepare_sales.sql
+-- Shared inputs for every forecast mode (run before 00_model_validation.sql or
+-- 03_hierarchical_demand_forecasts.sql)
+--
+-- Outputs:
+--   - variant_index   (rebuilt only if products/variants/vendors changed)
+--   - sales_daily
+-- ============================================================
+
+-- ---------- Shared variant lookup (rebuilt only if products/variants/vendors changed) ----------
+CALL `fiesta-inventory-forecast.fiesta_inventory.ensure_variant_index`();
+
+-- ---------- 0) sales_daily (DROP+CREATE to change clustering to variant_id) ----------
+DROP TABLE IF EXISTS `fiesta-inventory-forecast.fiesta_inventory.sales_daily`;
+
+CREATE TABLE `fiesta-inventory-forecast.fiesta_inventory.sales_daily`
+PARTITION BY sale_date
+CLUSTER BY variant_id AS
+SELECT
+  sale_date,
+  variant_id,
+  ANY_VALUE(sku) AS sku,               -- label only
+  SUM(quantity_sold) AS qty_sold
+FROM `fiesta-inventory-forecast.fiesta_inventory.sales_history_raw`
+WHERE sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 365 DAY)   -- ✅ partition filter
+  AND variant_id IS NOT NULL AND variant_id != ''
+GROUP BY sale_date, variant_id;
@@ -10,22 +10,13 @@ OPTIONS(
   auto_arima=TRUE,
   data_frequency='AUTO_FREQUENCY'
 ) AS
-WITH variant_vendor AS (
-  SELECT
-    v.variant_id,
-    p.vendor AS vendor_name
-  FROM `fiesta-inventory-forecast.fiesta_inventory.variants` v
-  JOIN `fiesta-inventory-forecast.fiesta_inventory.products` p
-    ON v.product_id = p.product_id
-  WHERE v.variant_id IS NOT NULL
-)
 SELECT
   sd.sale_date,
   sd.variant_id,
   sd.qty_sold
 FROM `fiesta-inventory-forecast.fiesta_inventory.sales_daily` sd
-JOIN variant_vendor vv
-  ON vv.variant_id = sd.variant_id
-WHERE vv.vendor_name <> 'Fiesta Carnival'
+JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_index` vi
+  ON vi.variant_id = sd.variant_id
+WHERE NOT vi.is_internal_vendor
   AND sd.sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 365 DAY)
   AND sd.qty_sold > 0;
\ No newline at end of file
@@ -1,6 +1,14 @@
 
--- Generate 60-day forecasts
-CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts` AS
+-- Generate 60-day forecasts (appended to demand_forecasts_history for this run_date)
+DECLARE this_run_date DATE DEFAULT CURRENT_DATE();
+
+DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history`
+WHERE run_date = this_run_date;
+
+INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history` (
+  run_date, variant_id, sku, forecast_date,
+  predicted_qty, confidence_lower, confidence_upper, created_at
+)
 WITH f AS (
   SELECT
     variant_id,
@@ -16,6 +24,7 @@ WITH f AS (
   WHERE forecast_value > 0
 )
 SELECT
+  this_run_date AS run_date,
   f.variant_id,
   v.sku,
   f.forecast_date,
@@ -24,6 +33,8 @@ SELECT
   f.confidence_upper,
   f.created_at
 FROM f
-LEFT JOIN `fiesta-inventory-forecast.fiesta_inventory.variants` v
+LEFT JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_index` v
   ON v.variant_id = f.variant_id;
 
+CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('demand_forecasts', this_run_date);
+
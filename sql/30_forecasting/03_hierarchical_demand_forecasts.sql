@@ -0,0 +1,360 @@
+-- ============================================================
+-- 03_hierarchical_demand_forecasts.sql
+-- Hierarchical demand forecasts: vendor -> product -> variant (top-down reconciliation)
+--
+-- Instead of one sparse ARIMA series per variant (trained only on qty_sold > 0 days),
+-- fit far fewer, denser, zero-filled daily series:
+--   - demand_arima_vendor   one series per vendor
+--   - demand_arima_product  one series per product
+-- then allocate in one set-based pass:
+--   vendor forecast -> products  (product forecast proportions, else recent sales share)
+--                   -> variants  (56d sales share within product, else 365d, else equal split)
+-- Daily integer quantities use cumulative rounding, so each variant's horizon total
+-- matches its exact allocation and variants sum back to the vendor forecast.
+--
+-- Quality gate: the vendor model is also backtested on the last 4 weeks (vs a previous-
+-- week baseline, same thresholds as 00_model_validation.sql). Restock in HIERARCHICAL
+-- mode trusts the allocated forecast for all variants of GOOD vendors, so the per-variant
+-- backtest is not needed in this mode.
+--
+-- Assumes 00_prepare_sales.sql ran first (refreshes sales_daily + variant_index)
+-- Outputs:
+--   - variant_hierarchy
+--   - demand_arima_vendor, demand_arima_product, demand_arima_vendor_backtest (MODELS)
+--   - hierarchical_quality_flags      <-- restock quality gate in 'HIERARCHICAL' mode
+--   - demand_forecasts_hierarchical   <-- used by restock in HIERARCHICAL mode (02_weekly_restock_hierarchical.sql)
+-- ============================================================
+
+-- ---------- Parameters ----------
+DECLARE train_start DATE DEFAULT DATE_SUB(CURRENT_DATE(), INTERVAL 365 DAY);
+DECLARE train_end DATE DEFAULT DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY);
+DECLARE min_history_days INT64 DEFAULT 28;   -- shorter series are allocated by sales share only
+DECLARE holdout_start DATE DEFAULT DATE_SUB(train_end, INTERVAL 27 DAY);   -- 4 x 7-day backtest weeks
+
+-- ---------- Hierarchy: variant -> product -> vendor (active vendors only) ----------
+CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.variant_hierarchy`
+CLUSTER BY vendor_name, product_id AS
+SELECT
+  variant_id,
+  product_id,
+  vendor_name
+FROM `fiesta-inventory-forecast.fiesta_inventory.variant_index`
+WHERE is_active
+  AND product_id IS NOT NULL AND product_id != '';
+
+CREATE TEMP TABLE variant_daily AS
+SELECT
+  h.variant_id,
+  h.product_id,
+  h.vendor_name,
+  sd.sale_date,
+  sd.qty_sold
+FROM `fiesta-inventory-forecast.fiesta_inventory.sales_daily` sd
+JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_hierarchy` h
+  ON h.variant_id = sd.variant_id
+WHERE sd.sale_date BETWEEN train_start AND train_end;   -- ✅ partition filter
+
+-- ---------- Dense (zero-filled) product + vendor series ----------
+CREATE TEMP TABLE product_series AS
+WITH bounds AS (
+  SELECT product_id, ANY_VALUE(vendor_name) AS vendor_name, MIN(sale_date) AS first_sale
+  FROM variant_daily
+  GROUP BY product_id
+),
+daily AS (
+  SELECT product_id, sale_date, SUM(qty_sold) AS qty_sold
+  FROM variant_daily
+  GROUP BY product_id, sale_date
+)
+SELECT
+  b.product_id,
+  b.vendor_name,
+  d AS sale_date,
+  COALESCE(daily.qty_sold, 0) AS qty_sold
+FROM bounds b
+CROSS JOIN UNNEST(GENERATE_DATE_ARRAY(b.first_sale, train_end)) AS d
+LEFT JOIN daily
+  ON daily.product_id = b.product_id
+ AND daily.sale_date = d;
+
+CREATE TEMP TABLE vendor_series AS
+SELECT vendor_name, sale_date, SUM(qty_sold) AS qty_sold
+FROM product_series
+GROUP BY vendor_name, sale_date;
+
+-- ---------- 1) Train vendor + product models ----------
+CREATE OR REPLACE MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_vendor`
+OPTIONS(
+  model_type='ARIMA_PLUS',
+  time_series_timestamp_col='sale_date',
+  time_series_data_col='qty_sold',
+  time_series_id_col='vendor_name',
+  holiday_region='US',
+  auto_arima=TRUE,
+  data_frequency='DAILY'
+) AS
+SELECT vendor_name, sale_date, qty_sold
+FROM vendor_series
+WHERE vendor_name IN (
+  SELECT vendor_name FROM vendor_series
+  GROUP BY vendor_name
+  HAVING COUNT(*) >= min_history_days
+);
+
+CREATE OR REPLACE MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_product`
+OPTIONS(
+  model_type='ARIMA_PLUS',
+  time_series_timestamp_col='sale_date',
+  time_series_data_col='qty_sold',
+  time_series_id_col='product_id',
+  holiday_region='US',
+  auto_arima=TRUE,
+  data_frequency='DAILY'
+) AS
+SELECT product_id, sale_date, qty_sold
+FROM product_series
+WHERE product_id IN (
+  SELECT product_id FROM product_series
+  GROUP BY product_id
+  HAVING COUNT(*) >= min_history_days
+);
+
+-- ---------- 1b) Vendor backtest: quality gate for the hierarchical forecast ----------
+CREATE OR REPLACE MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_vendor_backtest`
+OPTIONS(
+  model_type='ARIMA_PLUS',
+  time_series_timestamp_col='sale_date',
+  time_series_data_col='qty_sold',
+  time_series_id_col='vendor_name',
+  holiday_region='US',
+  auto_arima=TRUE,
+  data_frequency='DAILY'
+) AS
+SELECT vendor_name, sale_date, qty_sold
+FROM vendor_series
+WHERE sale_date < holdout_start
+  AND vendor_name IN (
+    SELECT vendor_name FROM vendor_series
+    WHERE sale_date < holdout_start
+    GROUP BY vendor_name
+    HAVING COUNT(*) >= min_history_days
+  );
+
+CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.hierarchical_quality_flags` AS
+WITH backtest_fc AS (
+  SELECT
+    vendor_name,
+    CAST(forecast_timestamp AS DATE) AS sale_date,
+    GREATEST(forecast_value, 0) AS qty
+  FROM ML.FORECAST(
+    MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_vendor_backtest`,
+    STRUCT(28 AS horizon, 0.95 AS confidence_level)
+  )
+),
+-- week_idx: -1 = week before the holdout (baseline), 0..3 = holdout weeks
+actual AS (
+  SELECT
+    vendor_name,
+    CAST(FLOOR(DATE_DIFF(sale_date, holdout_start, DAY) / 7) AS INT64) AS week_idx,
+    SUM(qty_sold) AS actual_qty
+  FROM vendor_series
+  WHERE sale_date >= DATE_SUB(holdout_start, INTERVAL 7 DAY)
+  GROUP BY vendor_name, week_idx
+),
+pred AS (
+  SELECT
+    vendor_name,
+    CAST(FLOOR(DATE_DIFF(sale_date, holdout_start, DAY) / 7) AS INT64) AS week_idx,
+    SUM(qty) AS predicted_qty
+  FROM backtest_fc
+  WHERE sale_date BETWEEN holdout_start AND train_end
+  GROUP BY vendor_name, week_idx
+),
+scored AS (
+  SELECT
+    a.vendor_name,
+    a.actual_qty,
+    COALESCE(p.predicted_qty, 0) AS predicted_qty,
+    COALESCE(b.actual_qty, 0) AS baseline_qty
+  FROM actual a
+  LEFT JOIN pred p
+    ON p.vendor_name = a.vendor_name
+   AND p.week_idx = a.week_idx
+  LEFT JOIN actual b
+    ON b.vendor_name = a.vendor_name
+   AND b.week_idx = a.week_idx - 1
+  WHERE a.week_idx BETWEEN 0 AND 3
+),
+agg AS (
+  SELECT
+    vendor_name,
+    SUM(actual_qty) AS sum_actual,
+    SAFE_DIVIDE(SUM(ABS(actual_qty - predicted_qty)), NULLIF(SUM(actual_qty), 0)) AS wape,
+    SAFE_DIVIDE(SUM(ABS(actual_qty - baseline_qty)), NULLIF(SUM(actual_qty), 0)) AS baseline_wape
+  FROM scored
+  GROUP BY vendor_name
+)
+SELECT
+  vendor_name,
+  wape,
+  baseline_wape,
+  CAST(sum_actual AS INT64) AS sum_actual,
+  CASE
+    WHEN vendor_name NOT IN (SELECT DISTINCT vendor_name FROM backtest_fc) THEN 'NO_DATA'
+    WHEN COALESCE(sum_actual, 0) < 4 THEN 'NO_DATA'
+    WHEN wape IS NULL THEN 'NO_DATA'
+    WHEN wape <= 0.60 THEN 'GOOD'
+    WHEN baseline_wape IS NOT NULL AND wape >= baseline_wape THEN 'WORSE_THAN_BASELINE'
+    WHEN wape > 1.00 THEN 'BAD'
+    WHEN wape > 0.80 THEN 'WEAK'
+    ELSE 'GOOD'
+  END AS model_quality,
+  CURRENT_TIMESTAMP() AS created_at
+FROM agg;
+
+-- ---------- 2) Forecasts (60 days; horizon must be a literal) ----------
+CREATE TEMP TABLE vendor_fc AS
+SELECT
+  vendor_name,
+  CAST(forecast_timestamp AS DATE) AS forecast_date,
+  GREATEST(forecast_value, 0) AS qty,
+  GREATEST(prediction_interval_lower_bound, 0) AS qty_lower,
+  GREATEST(prediction_interval_upper_bound, 0) AS qty_upper
+FROM ML.FORECAST(
+  MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_vendor`,
+  STRUCT(60 AS horizon, 0.95 AS confidence_level)
+);
+
+CREATE TEMP TABLE product_fc AS
+SELECT
+  product_id,
+  CAST(forecast_timestamp AS DATE) AS forecast_date,
+  GREATEST(forecast_value, 0) AS qty
+FROM ML.FORECAST(
+  MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_product`,
+  STRUCT(60 AS horizon, 0.95 AS confidence_level)
+);
+
+-- ---------- 3) Allocation shares ----------
+CREATE TEMP TABLE shares AS
+WITH base AS (
+  SELECT
+    h.variant_id,
+    h.product_id,
+    h.vendor_name,
+    COALESCE(SUM(IF(vd.sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 56 DAY), vd.qty_sold, 0)), 0) AS qty_56d,
+    COALESCE(SUM(vd.qty_sold), 0) AS qty_365d
+  FROM `fiesta-inventory-forecast.fiesta_inventory.variant_hierarchy` h
+  LEFT JOIN variant_daily vd
+    ON vd.variant_id = h.variant_id
+  GROUP BY h.variant_id, h.product_id, h.vendor_name
+),
+totals AS (
+  SELECT
+    *,
+    SUM(qty_56d) OVER (PARTITION BY product_id) AS product_56d,
+    SUM(qty_365d) OVER (PARTITION BY product_id) AS product_365d,
+    COUNT(*) OVER (PARTITION BY product_id) AS product_variants,
+    SUM(qty_56d) OVER (PARTITION BY vendor_name) AS vendor_56d,
+    SUM(qty_365d) OVER (PARTITION BY vendor_name) AS vendor_365d
+  FROM base
+)
+SELECT
+  variant_id,
+  product_id,
+  vendor_name,
+  -- variant's share of its product
+  CASE
+    WHEN product_56d > 0 THEN qty_56d / product_56d
+    WHEN product_365d > 0 THEN qty_365d / product_365d
+    ELSE 1 / product_variants
+  END AS variant_share,
+  -- product's share of its vendor (used for products without their own forecast)
+  CASE
+    WHEN vendor_56d > 0 THEN product_56d / vendor_56d
+    WHEN vendor_365d > 0 THEN product_365d / vendor_365d
+    ELSE 0
+  END AS product_share
+FROM totals;
+
+-- ---------- 4) Reconcile products to the vendor forecast ----------
+CREATE TEMP TABLE product_weights AS
+WITH products AS (
+  SELECT DISTINCT product_id, vendor_name, product_share
+  FROM shares
+),
+grid AS (
+  SELECT
+    p.product_id,
+    p.vendor_name,
+    p.product_share,
+    vf.forecast_date,
+    vf.qty AS vendor_qty,
+    vf.qty_lower AS vendor_lower,
+    vf.qty_upper AS vendor_upper,
+    pf.qty AS product_qty
+  FROM products p
+  JOIN vendor_fc vf
+    ON vf.vendor_name = p.vendor_name
+  LEFT JOIN product_fc pf
+    ON pf.product_id = p.product_id
+   AND pf.forecast_date = vf.forecast_date
+),
+totals AS (
+  SELECT
+    *,
+    -- share of the vendor owned by products that have their own model
+    SUM(IF(product_qty IS NOT NULL, product_share, 0)) OVER (PARTITION BY vendor_name, forecast_date) AS modeled_share,
+    SUM(COALESCE(product_qty, 0)) OVER (PARTITION BY vendor_name, forecast_date) AS modeled_qty
+  FROM grid
+)
+SELECT
+  product_id,
+  forecast_date,
+  vendor_qty,
+  vendor_lower,
+  vendor_upper,
+  -- modeled products split their share by forecast shape; the rest keep their sales share
+  CASE
+    WHEN modeled_qty > 0 AND product_qty IS NOT NULL
+      THEN modeled_share * product_qty / modeled_qty
+    ELSE product_share
+  END AS product_weight
+FROM totals;
+
+-- ---------- 5) Variant allocation ----------
+CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_hierarchical` AS
+WITH alloc AS (
+  SELECT
+    s.variant_id,
+    pw.forecast_date,
+    pw.vendor_qty * pw.product_weight * s.variant_share AS qty_exact,
+    pw.vendor_lower * pw.product_weight * s.variant_share AS lower_exact,
+    pw.vendor_upper * pw.product_weight * s.variant_share AS upper_exact
+  FROM product_weights pw
+  JOIN shares s
+    ON s.product_id = pw.product_id
+),
+cum AS (
+  SELECT
+    *,
+    SUM(qty_exact) OVER w AS cum_qty,
+    SUM(lower_exact) OVER w AS cum_lower,
+    SUM(upper_exact) OVER w AS cum_upper
+  FROM alloc
+  WINDOW w AS (PARTITION BY variant_id ORDER BY forecast_date ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+)
+SELECT
+  c.variant_id,
+  v.sku,
+  c.forecast_date,
+  -- cumulative rounding: integer days whose running total tracks the exact allocation
+  CAST(ROUND(c.cum_qty) - ROUND(c.cum_qty - c.qty_exact) AS INT64) AS predicted_qty,
+  CAST(ROUND(c.cum_lower) - ROUND(c.cum_lower - c.lower_exact) AS INT64) AS confidence_lower,
+  CAST(ROUND(c.cum_upper) - ROUND(c.cum_upper - c.upper_exact) AS INT64) AS confidence_upper,
+  c.qty_exact AS predicted_qty_exact,
+  CURRENT_TIMESTAMP() AS created_at
+FROM cum c
+LEFT JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_index` v
+  ON v.variant_id = c.variant_id
+WHERE c.qty_exact > 0;
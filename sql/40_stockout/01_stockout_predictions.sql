@@ -1,7 +1,21 @@
-CREATE OR REPLACE TABLE `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions` AS
+-- Stockout predictions from the latest demand_forecasts run (appended per run_date)
+DECLARE this_run_date DATE DEFAULT CURRENT_DATE();
+DECLARE forecast_run_date DATE DEFAULT (
+  SELECT run_date
+  FROM `fiesta-inventory-forecast.fiesta_inventory.forecast_runs`
+  WHERE table_name = 'demand_forecasts'
+);
+
+DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_history`
+WHERE run_date = this_run_date;
+
+INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_history` (
+  run_date, variant_id, current_stock, stockout_date, days_remaining, created_at
+)
 WITH daily_forecast AS (
   SELECT variant_id, forecast_date, predicted_qty
-  FROM `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts`
+  FROM `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history`
+  WHERE run_date = forecast_run_date   -- ✅ partition filter
 ),
 cum_calc AS (
   SELECT
@@ -19,6 +33,7 @@ cum_calc AS (
   WHERE ci.current_stock > 0
 )
 SELECT
+  this_run_date AS run_date,
   variant_id,
   current_stock,
   MIN(forecast_date) AS stockout_date,
@@ -27,3 +42,5 @@ SELECT
 FROM cum_calc
 WHERE cum_demand >= current_stock
 GROUP BY variant_id, current_stock;
+
+CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('stockout_predictions', this_run_date);
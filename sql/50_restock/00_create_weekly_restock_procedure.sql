@@ -0,0 +1,429 @@
+-- ============================================================
+-- 00_create_weekly_restock_procedure.sql
+-- Weekly pipeline: model -> forecasts -> stockouts -> restocks, as a procedure
+--   run_weekly_restock(forecast_mode)
+-- Entry points:
+--   01_weekly_restock.sql              CALL run_weekly_restock('VARIANT')
+--   02_weekly_restock_hierarchical.sql CALL run_weekly_restock('HIERARCHICAL')
+--
+-- Uses variant_id as canonical key (STRING)
+-- Stock is netted per variant x location (available + incoming) before rolling up.
+-- Outputs are appended per run_date to *_history tables (see 00_setup/05); the
+-- demand_forecasts / stockout_predictions / vendor_restocks_weekly views show the latest run.
+--
+-- forecast_mode:
+--   'VARIANT'      - one ARIMA series per variant; forecast used where the variant-level
+--                    backtest (model_quality_flags, 30_forecasting/00) is GOOD
+--   'HIERARCHICAL' - reuse demand_forecasts_hierarchical (run 30_forecasting/03 first);
+--                    forecast used for every variant of a vendor whose hierarchical
+--                    backtest (hierarchical_quality_flags) is GOOD, incl. the long tail
+-- Both modes assume sales_daily + variant_index are fresh (30_forecasting/00_prepare_sales).
+-- ============================================================
+
+CREATE OR REPLACE PROCEDURE `fiesta-inventory-forecast.fiesta_inventory.run_weekly_restock`(forecast_mode STRING)
+BEGIN
+  DECLARE latest_snapshot_date DATE;
+  DECLARE this_run_date DATE DEFAULT CURRENT_DATE();
+  DECLARE quality_run_date DATE DEFAULT (
+    SELECT run_date
+    FROM `fiesta-inventory-forecast.fiesta_inventory.forecast_runs`
+    WHERE table_name = 'model_quality_flags'
+  );
+
+  -- ---------- latest inventory snapshot (partition-safe) ----------
+  SET latest_snapshot_date = (
+    SELECT MAX(snapshot_date)
+    FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw`
+    WHERE snapshot_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY)
+  );
+
+  -- ---------- Inventory position: variant x location, rolled up per variant (one pass) ----------
+  -- Shopify's `available` already excludes committed units, so committed_qty is reported,
+  -- not subtracted again. incoming_qty (open POs) counts as supply so it isn't re-ordered.
+  CREATE TEMP TABLE location_position AS
+  SELECT
+    variant_id,
+    location_id,
+    SUM(available_qty) AS available_qty,
+    SUM(COALESCE(incoming_qty, 0)) AS incoming_qty,
+    SUM(COALESCE(committed_qty, 0)) AS committed_qty
+  FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw`
+  WHERE snapshot_date = latest_snapshot_date   -- ✅ partition filter
+    AND variant_id IS NOT NULL AND variant_id != ''
+  GROUP BY variant_id, location_id;
+
+  CREATE TEMP TABLE variant_position AS
+  SELECT
+    variant_id,
+    SUM(available_qty) AS raw_stock,
+    GREATEST(SUM(available_qty), 0) AS current_stock,
+    SUM(incoming_qty) AS incoming_qty,
+    SUM(committed_qty) AS committed_qty,
+    GREATEST(SUM(available_qty), 0) + SUM(incoming_qty) AS stock_position,
+    COUNTIF(available_qty < 0) AS negative_locations
+  FROM location_position
+  GROUP BY variant_id;
+
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history`
+  WHERE run_date = this_run_date;
+
+  IF forecast_mode = 'HIERARCHICAL' THEN
+
+    -- ---------- 1+2) Forecasts from the vendor/product hierarchy ----------
+    INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history` (
+      run_date, variant_id, sku, forecast_date,
+      predicted_qty, confidence_lower, confidence_upper, created_at
+    )
+    SELECT
+      this_run_date AS run_date,
+      variant_id,
+      sku,
+      forecast_date,
+      predicted_qty,
+      confidence_lower,
+      confidence_upper,
+      created_at
+    FROM `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_hierarchical`;
+
+  ELSE
+
+    -- ---------- 1) Train/refresh ARIMA model (variant_id) ----------
+    CREATE OR REPLACE MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_model`
+    OPTIONS(
+      model_type='ARIMA_PLUS',
+      time_series_timestamp_col='sale_date',
+      time_series_data_col='qty_sold',
+      time_series_id_col='variant_id',
+      holiday_region='US',
+      auto_arima=TRUE,
+      data_frequency='AUTO_FREQUENCY'
+    ) AS
+    SELECT
+      sd.sale_date,
+      sd.variant_id,
+      sd.qty_sold
+    FROM `fiesta-inventory-forecast.fiesta_inventory.sales_daily` sd
+    JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_index` vi
+      ON vi.variant_id = sd.variant_id
+    WHERE sd.sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 365 DAY)
+      AND vi.is_active
+      AND sd.qty_sold > 0;
+
+    -- ---------- 2) Forecasts (60 days) ----------
+    INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history` (
+      run_date, variant_id, sku, forecast_date,
+      predicted_qty, confidence_lower, confidence_upper, created_at
+    )
+    SELECT
+      this_run_date AS run_date,
+      f.variant_id,
+      v.sku,
+      CAST(f.forecast_timestamp AS DATE) AS forecast_date,
+      GREATEST(CAST(f.forecast_value AS INT64), 0) AS predicted_qty,
+      GREATEST(CAST(f.prediction_interval_lower_bound AS INT64), 0) AS confidence_lower,
+      GREATEST(CAST(f.prediction_interval_upper_bound AS INT64), 0) AS confidence_upper,
+      CURRENT_TIMESTAMP() AS created_at
+    FROM ML.FORECAST(
+      MODEL `fiesta-inventory-forecast.fiesta_inventory.demand_arima_model`,
+      STRUCT(60 AS horizon, 0.95 AS confidence_level)
+    ) f
+    LEFT JOIN `fiesta-inventory-forecast.fiesta_inventory.variant_index` v
+      ON v.variant_id = f.variant_id
+    WHERE f.forecast_value > 0;
+
+  END IF;
+
+  CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('demand_forecasts', this_run_date);
+
+  -- ---------- 3) Stockout predictions ----------
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_history`
+  WHERE run_date = this_run_date;
+
+  INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_history` (
+    run_date, variant_id, current_stock, stockout_date, days_remaining, created_at
+  )
+  WITH daily_forecast AS (
+    SELECT variant_id, forecast_date, predicted_qty
+    FROM `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history`
+    WHERE run_date = this_run_date   -- ✅ partition filter
+  ),
+  cum_calc AS (
+    SELECT
+      f.variant_id,
+      f.forecast_date,
+      ci.current_stock,
+      SUM(f.predicted_qty) OVER (
+        PARTITION BY f.variant_id
+        ORDER BY f.forecast_date
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+      ) AS cum_demand
+    FROM daily_forecast f
+    JOIN variant_position ci
+      ON f.variant_id = ci.variant_id
+    WHERE ci.current_stock > 0
+  )
+  SELECT
+    this_run_date AS run_date,
+    variant_id,
+    current_stock,
+    MIN(forecast_date) AS stockout_date,
+    DATE_DIFF(MIN(forecast_date), CURRENT_DATE(), DAY) AS days_remaining,
+    CURRENT_TIMESTAMP() AS created_at
+  FROM cum_calc
+  WHERE cum_demand >= current_stock
+  GROUP BY variant_id, current_stock;
+
+  CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('stockout_predictions', this_run_date);
+
+  -- ---------- 3b) Stockout predictions per location ----------
+  -- Sales carry no location, so variant demand is split by each location's share of
+  -- recent stock depletion (day-over-day drops in available, last 28 days of snapshots);
+  -- variants with no observed depletion at any location fall back to an equal split.
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_location_history`
+  WHERE run_date = this_run_date;
+
+  INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.stockout_predictions_location_history` (
+    run_date, variant_id, location_id, current_stock, demand_share,
+    stockout_date, days_remaining, created_at
+  )
+  WITH snapshots AS (
+    SELECT
+      variant_id,
+      location_id,
+      snapshot_date,
+      SUM(available_qty) AS available_qty
+    FROM `fiesta-inventory-forecast.fiesta_inventory.inventory_snapshots_raw`
+    WHERE snapshot_date BETWEEN DATE_SUB(latest_snapshot_date, INTERVAL 28 DAY) AND latest_snapshot_date   -- ✅ partition filter
+      AND variant_id IS NOT NULL AND variant_id != ''
+    GROUP BY variant_id, location_id, snapshot_date
+  ),
+  depletion AS (
+    SELECT
+      variant_id,
+      location_id,
+      SUM(GREATEST(prev_qty - available_qty, 0)) AS depleted_qty
+    FROM (
+      SELECT
+        *,
+        LAG(available_qty) OVER (PARTITION BY variant_id, location_id ORDER BY snapshot_date) AS prev_qty
+      FROM snapshots
+    )
+    WHERE prev_qty IS NOT NULL
+    GROUP BY variant_id, location_id
+  ),
+  shares AS (
+    SELECT
+      lp.variant_id,
+      lp.location_id,
+      GREATEST(lp.available_qty, 0) AS current_stock,
+      COALESCE(
+        SAFE_DIVIDE(
+          COALESCE(d.depleted_qty, 0),
+          SUM(COALESCE(d.depleted_qty, 0)) OVER (PARTITION BY lp.variant_id)
+        ),
+        1 / COUNT(*) OVER (PARTITION BY lp.variant_id)
+      ) AS demand_share
+    FROM location_position lp
+    LEFT JOIN depletion d
+      ON d.variant_id = lp.variant_id
+     AND d.location_id = lp.location_id
+  ),
+  cum_calc AS (
+    SELECT
+      sh.variant_id,
+      sh.location_id,
+      sh.current_stock,
+      sh.demand_share,
+      f.forecast_date,
+      sh.demand_share * SUM(f.predicted_qty) OVER (
+        PARTITION BY sh.variant_id, sh.location_id
+        ORDER BY f.forecast_date
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+      ) AS cum_demand
+    FROM shares sh
+    JOIN `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history` f
+      ON f.variant_id = sh.variant_id
+     AND f.run_date = this_run_date   -- ✅ partition filter
+    WHERE sh.current_stock > 0
+  )
+  SELECT
+    this_run_date AS run_date,
+    variant_id,
+    location_id,
+    current_stock,
+    demand_share,
+    MIN(forecast_date) AS stockout_date,
+    DATE_DIFF(MIN(forecast_date), CURRENT_DATE(), DAY) AS days_remaining,
+    CURRENT_TIMESTAMP() AS created_at
+  FROM cum_calc
+  WHERE cum_demand >= current_stock
+  GROUP BY variant_id, location_id, current_stock, demand_share;
+
+  CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('stockout_predictions_location', this_run_date);
+
+  -- ---------- 4) Weekly vendor restocks ----------
+  -- Quality gate matching the forecast source: variant-level backtest, or the vendor's
+  -- hierarchical backtest applied to all of its variants.
+  IF forecast_mode = 'HIERARCHICAL' THEN
+    CREATE TEMP TABLE variant_quality AS
+    SELECT vi.variant_id, hq.model_quality
+    FROM `fiesta-inventory-forecast.fiesta_inventory.variant_index` vi
+    JOIN `fiesta-inventory-forecast.fiesta_inventory.hierarchical_quality_flags` hq
+      ON hq.vendor_name = vi.vendor_name;
+  ELSE
+    CREATE TEMP TABLE variant_quality AS
+    SELECT variant_id, model_quality
+    FROM `fiesta-inventory-forecast.fiesta_inventory.model_quality_flags_history`
+    WHERE run_date = quality_run_date;   -- ✅ partition filter (latest validation run)
+  END IF;
+
+  DELETE FROM `fiesta-inventory-forecast.fiesta_inventory.vendor_restocks_weekly_history`
+  WHERE run_date = this_run_date;
+
+  INSERT INTO `fiesta-inventory-forecast.fiesta_inventory.vendor_restocks_weekly_history` (
+    run_date, vendor_name, variant_id, sku, product_title, variant_title,
+    current_stock, raw_stock, negative_stock_flag,
+    incoming_qty, committed_qty, stock_position,
+    lead_time_days, moq, pack_size, horizon_days,
+    model_quality, expected_demand, demand_source, reorder_qty,
+    expected_demand_forecast, expected_demand_fallback,
+    snapshot_date, created_at
+  )
+  -- Active weekly-cadence variants with vendor settings, straight from the shared index
+  WITH variant_vendor AS (
+    SELECT
+      variant_id,
+      sku,
+      vendor_name,
+      product_title,
+      variant_title,
+      lead_time_days,
+      moq,
+      pack_size
+    FROM `fiesta-inventory-forecast.fiesta_inventory.variant_index`
+    WHERE is_active
+      AND has_vendor_settings   -- vendors row required (lead time / MOQ / pack size)
+      AND restock_frequency_days = 7
+  ),
+  demand_window AS (
+    SELECT
+      vv.vendor_name,
+      vv.variant_id,
+      vv.lead_time_days,
+      DATE_ADD(CURRENT_DATE(), INTERVAL (vv.lead_time_days + 7 + 3) DAY) AS horizon_end,
+      (vv.lead_time_days + 7 + 3) AS horizon_days
+    FROM variant_vendor vv
+  ),
+  forecast_demand AS (
+    SELECT
+      w.vendor_name,
+      w.variant_id,
+      SUM(f.predicted_qty) AS expected_demand_forecast
+    FROM demand_window w
+    JOIN `fiesta-inventory-forecast.fiesta_inventory.demand_forecasts_history` f
+      ON f.variant_id = w.variant_id
+     AND f.run_date = this_run_date   -- ✅ partition filter
+     AND f.forecast_date BETWEEN CURRENT_DATE() AND w.horizon_end
+    GROUP BY w.vendor_name, w.variant_id
+  ),
+  fallback_demand AS (
+    SELECT
+      variant_id,
+      SAFE_DIVIDE(SUM(quantity_sold), 56) AS avg_daily_units_56d
+    FROM `fiesta-inventory-forecast.fiesta_inventory.sales_history_raw`
+    WHERE sale_date >= DATE_SUB(CURRENT_DATE(), INTERVAL 56 DAY)   -- ✅ partition filter
+      AND variant_id IS NOT NULL AND variant_id != ''
+    GROUP BY variant_id
+  ),
+  mq AS (
+    SELECT variant_id, model_quality
+    FROM variant_quality
+  ),
+  calc AS (
+    SELECT
+      vv.vendor_name,
+      vv.variant_id,
+      vv.sku,
+      vv.product_title,
+      vv.variant_title,
+
+      COALESCE(vp.current_stock, 0) AS current_stock,
+      COALESCE(vp.raw_stock, 0) AS raw_stock,
+      (COALESCE(vp.raw_stock, 0) < 0 OR COALESCE(vp.negative_locations, 0) > 0) AS negative_stock_flag,
+      COALESCE(vp.incoming_qty, 0) AS incoming_qty,
+      COALESCE(vp.committed_qty, 0) AS committed_qty,
+      COALESCE(vp.stock_position, 0) AS stock_position,
+
+      vv.lead_time_days,
+      vv.moq,
+      vv.pack_size,
+      w.horizon_days,
+
+      COALESCE(mq.model_quality, 'NO_DATA') AS model_quality,
+
+      CASE
+        WHEN COALESCE(mq.model_quality, 'NO_DATA') = 'GOOD'
+          THEN COALESCE(fd.expected_demand_forecast, 0)
+        ELSE CAST(ROUND(COALESCE(fb.avg_daily_units_56d, 0) * w.horizon_days) AS INT64)
+      END AS expected_demand,
+
+      CASE
+        WHEN COALESCE(mq.model_quality, 'NO_DATA') = 'GOOD'
+          THEN IF(forecast_mode = 'HIERARCHICAL', 'FORECAST_HIERARCHICAL', 'FORECAST')
+        ELSE 'FALLBACK_56D'
+      END AS demand_source,
+
+      CASE
+        WHEN (
+          CASE
+            WHEN COALESCE(mq.model_quality, 'NO_DATA') = 'GOOD'
+              THEN COALESCE(fd.expected_demand_forecast, 0)
+            ELSE CAST(ROUND(COALESCE(fb.avg_daily_units_56d, 0) * w.horizon_days) AS INT64)
+          END
+        ) - COALESCE(vp.stock_position, 0) <= 0 THEN 0
+        ELSE GREATEST(
+          vv.moq,
+          CAST(
+            CEIL((
+              (
+                CASE
+                  WHEN COALESCE(mq.model_quality, 'NO_DATA') = 'GOOD'
+                    THEN COALESCE(fd.expected_demand_forecast, 0)
+                  ELSE CAST(ROUND(COALESCE(fb.avg_daily_units_56d, 0) * w.horizon_days) AS INT64)
+                END
+              ) - COALESCE(vp.stock_position, 0)
+            ) / vv.pack_size) * vv.pack_size AS INT64
+          )
+        )
+      END AS reorder_qty,
+
+      COALESCE(fd.expected_demand_forecast, 0) AS expected_demand_forecast,
+      CAST(ROUND(COALESCE(fb.avg_daily_units_56d, 0) * w.horizon_days) AS INT64) AS expected_demand_fallback,
+
+      latest_snapshot_date AS snapshot_date,
+      CURRENT_TIMESTAMP() AS created_at
+
+    FROM variant_vendor vv
+    JOIN demand_window w
+      ON w.vendor_name = vv.vendor_name
+     AND w.variant_id = vv.variant_id
+
+    LEFT JOIN variant_position vp
+      ON vp.variant_id = vv.variant_id
+    LEFT JOIN forecast_demand fd
+      ON fd.vendor_name = vv.vendor_name
+     AND fd.variant_id = vv.variant_id
+    LEFT JOIN fallback_demand fb
+      ON fb.variant_id = vv.variant_id
+    LEFT JOIN mq
+      ON mq.variant_id = vv.variant_id
+  )
+
+  SELECT
+    this_run_date AS run_date,
+    *
+  FROM calc
+  WHERE reorder_qty > 0;
+
+  CALL `fiesta-inventory-forecast.fiesta_inventory.set_latest_run`('vendor_restocks_weekly', this_run_date);
+END;
@@ -0,0 +1,10 @@
+-- ============================================================
+-- 02_weekly_restock_hierarchical.sql
+-- Weekly restock with vendor/product-level forecasts allocated to variants.
+-- Assumes 30_forecasting/00_prepare_sales.sql + 03_hierarchical_demand_forecasts.sql ran
+-- first (demand_forecasts_hierarchical, hierarchical_quality_flags) and
+-- 00_create_weekly_restock_procedure.sql defined the procedure. The per-variant
+-- backtest (00_model_validation.sql) is not needed in this mode.
+-- ============================================================
+
+CALL `fiesta-inventory-forecast.fiesta_inventory.run_weekly_restock`('HIERARCHICAL');
@@ -4,6 +4,7 @@
 --   current_inventory (sku-level snapshot)
 --   vendor_restocks_weekly (sku + vendor mapping + restock metrics)
 --   vendor_status (vendor archived flag)
+--   variant_index (variant -> vendor/product lookup; see 00_setup/07_create_variant_index.sql)
 -- ============================================================
 
 -- 1) Active vendors
@@ -13,27 +14,20 @@ FROM `fiesta-inventory-forecast.fiesta_inventory.vendor_status`
 WHERE COALESCE(archived, FALSE) = FALSE;
 
 
--- 2) Canonical mapping: variant_id -> vendor/product/variant attributes
+-- 2) Canonical mapping: variant_id -> vendor/product/variant attributes (shared variant_index)
 CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.v_variant_vendor_map` AS
 SELECT
-  v.variant_id,
-  NULLIF(v.sku, '') AS sku,
-  p.vendor AS vendor_name,
-  p.title AS product_title,
-  v.title AS variant_title
-FROM `fiesta-inventory-forecast.fiesta_inventory.variants` v
-JOIN `fiesta-inventory-forecast.fiesta_inventory.products` p
-  ON v.product_id = p.product_id
-WHERE v.variant_id IS NOT NULL
-  AND p.vendor IS NOT NULL AND p.vendor != '';
+  variant_id,
+  sku,
+  vendor_name,
+  product_title,
+  variant_title,
+  has_vendor_status,
+  vendor_archived
+FROM `fiesta-inventory-forecast.fiesta_inventory.variant_index`;
 
 -- 3) Current inventory with vendor attached + active vendor filter
 CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.v_current_inventory_active` AS
-WITH active_vendors AS (
-  SELECT vendor_name
-  FROM `fiesta-inventory-forecast.fiesta_inventory.vendor_status`
-  WHERE COALESCE(archived, FALSE) = FALSE
-)
 SELECT
   ci.snapshot_date,
   ci.variant_id,
@@ -47,7 +41,8 @@ SELECT
 FROM `fiesta-inventory-forecast.fiesta_inventory.current_inventory` ci
 LEFT JOIN `fiesta-inventory-forecast.fiesta_inventory.v_variant_vendor_map` vvm
   ON vvm.variant_id = ci.variant_id
-WHERE vvm.vendor_name IN (SELECT vendor_name FROM active_vendors);
+WHERE vvm.has_vendor_status      -- only vendors listed in vendor_status (as v_active_vendors)
+  AND vvm.vendor_archived = FALSE;
 
 -- 4) Restock list filtered to active vendors (and optional internal vendor exclusion)
 CREATE OR REPLACE VIEW `fiesta-inventory-forecast.fiesta_inventory.v_vendor_restocks_weekly_active` AS
@@ -0,0 +1,210 @@
+"""
+sync_rows.py
+Compact row types for synced Shopify records (sales, inventory levels, variants).
+
+A backfill can hold hundreds of thousands of rows in memory. Instead of one dict per
+row (repeating every key string and a fresh copy of every sku/vendor/date string), rows
+are __slots__ dataclasses with interned repeated strings and integer-encoded dates.
+to_dict() restores the exact sync_data.json shape, so the BigQuery loader is unaffected.
+
+Run directly for a memory benchmark against the old dict-of-strings rows:
+  python sync_rows.py [n_rows]
+"""
+
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+
+
+def encode_date(value: str) -> int:
+    """ISO date (YYYY-MM-DD) -> day ordinal."""
+    return date.fromisoformat(value).toordinal()
+
+
+def decode_date(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+def encode_ts(value: str) -> int:
+    """ISO UTC timestamp ('...Z') -> epoch seconds."""
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def decode_ts(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def intern_str(value):
+    """Intern repeated labels (sku, vendor, ids) so every row shares one string object."""
+    return sys.intern(value) if value else value
+
+
+@dataclass(slots=True)
+class SaleRow:
+    sale_id: str
+    order_id: str
+    order_name: str
+    variant_id: str
+    sku: str
+    product_title: str | None
+    quantity_sold: int
+    sale_day: int  # date ordinal
+    sale_epoch: int  # UTC epoch seconds
+    vendor: str
+
+    def to_dict(self):
+        return {
+            "sale_id": self.sale_id,
+            "order_id": self.order_id,
+            "order_name": self.order_name,
+            "variant_id": self.variant_id,
+            "sku": self.sku,
+            "product_title": self.product_title,
+            "quantity_sold": self.quantity_sold,
+            "sale_date": decode_date(self.sale_day),
+            "sale_timestamp": decode_ts(self.sale_epoch),
+            "vendor": self.vendor,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            sale_id=d["sale_id"],
+            order_id=d["order_id"],
+            order_name=d["order_name"],
+            variant_id=intern_str(d["variant_id"]),
+            sku=intern_str(d["sku"]),
+            product_title=intern_str(d["product_title"]),
+            quantity_sold=int(d["quantity_sold"]),
+            sale_day=encode_date(d["sale_date"]),
+            sale_epoch=encode_ts(d["sale_timestamp"]),
+            vendor=intern_str(d["vendor"]),
+        )
+
+
+@dataclass(slots=True)
+class InventoryRow:
+    variant_id: str
+    sku: str
+    location_id: str
+    available_qty: int
+    incoming_qty: int
+    committed_qty: int
+    snapshot_day: int  # date ordinal
+    snapshot_timestamp: str  # one shared string per location sync
+
+    @property
+    def snapshot_id(self) -> str:
+        return f"{self.variant_id}_{self.location_id}_{decode_date(self.snapshot_day)}"
+
+    def to_dict(self):
+        return {
+            "snapshot_id": self.snapshot_id,
+            "variant_id": self.variant_id,
+            "sku": self.sku,
+            "location_id": self.location_id,
+            "available_qty": self.available_qty,
+            "incoming_qty": self.incoming_qty,
+            "committed_qty": self.committed_qty,
+            "snapshot_date": decode_date(self.snapshot_day),
+            "snapshot_timestamp": self.snapshot_timestamp,
+        }
+
+
+@dataclass(slots=True)
+class VariantRow:
+    variant_id: str
+    product_id: str
+    sku: str
+    title: str | None
+    price: float
+    inventory_item_id: str
+
+    def to_dict(self):
+        return {
+            "variant_id": self.variant_id,
+            "product_id": self.product_id,
+            "sku": self.sku,
+            "title": self.title,
+            "price": self.price,
+            "inventory_item_id": self.inventory_item_id,
+        }
+
+
+def encode_row(obj):
+    """json.dump(default=...) hook: serialize compact rows as their dict form."""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _benchmark(n_rows: int = 200_000) -> None:
+    """Compare retained memory of dict-of-strings sale rows vs SaleRow for n_rows synthetic lines."""
+    import gc
+    import tracemalloc
+
+    def raw_lines():
+        # Fresh string objects per row, like json.loads of API responses produces.
+        for i in range(n_rows):
+            order = i // 3
+            yield {
+                "order_id": str(1000000 + order),
+                "line_id": str(5000000 + i),
+                "variant_id": str(40000000 + i % 2000),
+                "sku": "SKU-" + str(i % 2000),
+                "title": "Product " + str(i % 2000),
+                "vendor": "Vendor " + str(i % 40),
+                "quantity": 1 + i % 4,
+                "created_at": f"2025-{1 + order % 12:02d}-{1 + order % 28:02d}T12:00:00Z",
+            }
+
+    def as_dict(li):
+        ts = li["created_at"]
+        return {
+            "sale_id": f"{li['order_id']}_{li['line_id']}",
+            "order_id": li["order_id"],
+            "order_name": "#" + li["order_id"],
+            "variant_id": li["variant_id"],
+            "sku": li["sku"],
+            "product_title": li["title"],
+            "quantity_sold": li["quantity"],
+            "sale_date": ts[:10],
+            "sale_timestamp": ts,
+            "vendor": li["vendor"],
+        }
+
+    def as_row(li):
+        ts = li["created_at"]
+        return SaleRow(
+            sale_id=f"{li['order_id']}_{li['line_id']}",
+            order_id=li["order_id"],
+            order_name="#" + li["order_id"],
+            variant_id=intern_str(li["variant_id"]),
+            sku=intern_str(li["sku"]),
+            product_title=intern_str(li["title"]),
+            quantity_sold=li["quantity"],
+            sale_day=encode_date(ts[:10]),
+            sale_epoch=encode_ts(ts),
+            vendor=intern_str(li["vendor"]),
+        )
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        rows = [build(li) for li in raw_lines()]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del rows
+        return current
+
+    dict_bytes = measure(as_dict)
+    row_bytes = measure(as_row)
+
+    print(f"Rows: {n_rows:,}")
+    print(f"dict rows:  {dict_bytes / 1e6:8.1f} MB ({dict_bytes / n_rows:6.0f} B/row)")
+    print(f"SaleRow:    {row_bytes / 1e6:8.1f} MB ({row_bytes / n_rows:6.0f} B/row)")
+    print(f"Reduction:  {dict_bytes / max(row_bytes, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,175 @@
+"""
+variant_index.py
+In-memory form of the shared variant_index lookup (sql/00_setup/07_create_variant_index.sql).
+
+One entry per variant_id with its product, SKU, titles, price, vendor and vendor settings
+(lead time / MOQ / pack size defaults, cadence, vendor_status / archived flags), so Python code can look a
+variant up without re-joining products + variants + vendors.
+
+Build it from a sync payload (products + variants, optionally vendor settings) or from
+the BigQuery table:
+  VariantIndex.from_sync_data(data)
+  VariantIndex.from_bigquery()
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sync_rows import intern_str
+
+INTERNAL_VENDOR = "Fiesta Carnival"
+DEFAULT_LEAD_TIME_DAYS = 5
+DEFAULT_MOQ = 6
+DEFAULT_PACK_SIZE = 6
+
+
+def _or_default(value: Optional[int], default: int) -> int:
+    """COALESCE(value, default): only a missing setting takes the default, 0 is kept."""
+    return default if value is None else value
+
+
+@dataclass(slots=True)
+class VariantIndexEntry:
+    variant_id: str
+    product_id: str
+    sku: Optional[str]
+    product_title: Optional[str]
+    variant_title: Optional[str]
+    price: Optional[float]
+    vendor_name: str
+    lead_time_days: int = DEFAULT_LEAD_TIME_DAYS
+    moq: int = DEFAULT_MOQ
+    pack_size: int = DEFAULT_PACK_SIZE
+    restock_frequency_days: Optional[int] = None
+    has_vendor_settings: bool = False
+    has_vendor_status: bool = False
+    vendor_archived: bool = False
+
+    @property
+    def is_internal_vendor(self) -> bool:
+        return self.vendor_name == INTERNAL_VENDOR
+
+    @property
+    def is_active(self) -> bool:
+        """Listed in vendor_status, not archived, not internal (same rule as the SQL index)."""
+        return self.has_vendor_status and not self.vendor_archived and not self.is_internal_vendor
+
+
+class VariantIndex:
+    """variant_id -> VariantIndexEntry, with secondary SKU and vendor lookups."""
+
+    __slots__ = ("_by_variant", "_by_sku", "_by_vendor")
+
+    def __init__(self, entries: Iterable[VariantIndexEntry] = ()):
+        self._by_variant: Dict[str, VariantIndexEntry] = {}
+        self._by_sku: Dict[str, List[VariantIndexEntry]] = {}
+        self._by_vendor: Dict[str, List[VariantIndexEntry]] = {}
+        for entry in entries:
+            if entry.variant_id in self._by_variant:
+                continue  # variant_id is unique; keep the first
+            self._by_variant[entry.variant_id] = entry
+            if entry.sku:
+                self._by_sku.setdefault(entry.sku, []).append(entry)
+            self._by_vendor.setdefault(entry.vendor_name, []).append(entry)
+
+    def __len__(self) -> int:
+        return len(self._by_variant)
+
+    def __contains__(self, variant_id: str) -> bool:
+        return variant_id in self._by_variant
+
+    def __iter__(self) -> Iterator[VariantIndexEntry]:
+        return iter(self._by_variant.values())
+
+    def get(self, variant_id: str) -> Optional[VariantIndexEntry]:
+        return self._by_variant.get(variant_id)
+
+    def vendor_of(self, variant_id: str) -> Optional[str]:
+        entry = self._by_variant.get(variant_id)
+        return entry.vendor_name if entry else None
+
+    def by_sku(self, sku: str) -> List[VariantIndexEntry]:
+        """All variants with this SKU (SKUs are labels, not unique keys)."""
+        return list(self._by_sku.get(sku, ()))
+
+    def for_vendor(self, vendor_name: str) -> List[VariantIndexEntry]:
+        return list(self._by_vendor.get(vendor_name, ()))
+
+    @classmethod
+    def from_sync_data(
+        cls,
+        data: Dict[str, Any],
+        vendors: Optional[Dict[str, Dict[str, Any]]] = None,
+        status: Optional[Dict[str, bool]] = None,
+        cadence: Optional[Dict[str, int]] = None,
+    ) -> "VariantIndex":
+        """
+        Build from sync_data.json sections. vendors maps vendor_name -> {lead_time_days,
+        moq, pack_size}; status maps vendor_name -> archived (the vendor_status rows; vendors
+        not in it are inactive); cadence maps vendor_name -> restock_frequency_days.
+        Variants whose product has no vendor are left out.
+        """
+        vendors = vendors or {}
+        status = status or {}
+        cadence = cadence or {}
+        products = {p["product_id"]: p for p in data.get("products", []) if p.get("product_id")}
+
+        entries = []
+        for v in data.get("variants", []):
+            product = products.get(v.get("product_id"))
+            vendor_name = product.get("vendor") if product else None
+            if not v.get("variant_id") or not vendor_name:
+                continue
+            settings = vendors.get(vendor_name)  # None: no vendors row (defaults apply)
+            values = settings or {}
+            entries.append(
+                VariantIndexEntry(
+                    variant_id=v["variant_id"],
+                    product_id=intern_str(v["product_id"]),
+                    sku=intern_str(v.get("sku") or None),
+                    product_title=intern_str(product.get("title")),
+                    variant_title=intern_str(v.get("title")),
+                    price=float(v["price"]) if v.get("price") not in (None, "") else None,
+                    vendor_name=intern_str(vendor_name),
+                    lead_time_days=_or_default(values.get("lead_time_days"), DEFAULT_LEAD_TIME_DAYS),
+                    moq=_or_default(values.get("moq"), DEFAULT_MOQ),
+                    pack_size=_or_default(values.get("pack_size"), DEFAULT_PACK_SIZE),
+                    restock_frequency_days=cadence.get(vendor_name),
+                    has_vendor_settings=settings is not None,
+                    has_vendor_status=vendor_name in status,
+                    vendor_archived=bool(status.get(vendor_name)),
+                )
+            )
+        return cls(entries)
+
+    @classmethod
+    def from_bigquery(cls) -> "VariantIndex":
+        """Read the materialized variant_index table (one query, no re-join)."""
+        from bq_client import dataset_id, get_client
+
+        rows = get_client().query(f"""
+        SELECT
+          variant_id, product_id, sku, product_title, variant_title, price, vendor_name,
+          lead_time_days, moq, pack_size, restock_frequency_days,
+          has_vendor_settings, has_vendor_status, vendor_archived
+        FROM `{dataset_id()}.variant_index`
+        """).result()
+        return cls(
+            VariantIndexEntry(
+                variant_id=row["variant_id"],
+                product_id=intern_str(row["product_id"]),
+                sku=intern_str(row["sku"]),
+                product_title=intern_str(row["product_title"]),
+                variant_title=intern_str(row["variant_title"]),
+                price=row["price"],
+                vendor_name=intern_str(row["vendor_name"]),
+                lead_time_days=row["lead_time_days"],
+                moq=row["moq"],
+                pack_size=row["pack_size"],
+                restock_frequency_days=row["restock_frequency_days"],
+                has_vendor_settings=row["has_vendor_settings"],
+                has_vendor_status=row["has_vendor_status"],
+                vendor_archived=row["vendor_archived"],
+            )
+            for row in rows
+        )